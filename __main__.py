@@ -4,6 +4,7 @@
 
 # tracemalloc.start()
 
+import argparse
 import math
 import pathlib
 from typing import Any, Optional
@@ -14,9 +15,12 @@ import create_menu as cm
 import display
 import enemy
 import entity
+import input_state
 import mage
 import player
+import preloader
 import rogue
+import scene
 import utils
 import warrior
 
@@ -28,10 +32,7 @@ def play(
     options: dict[str, Any],  # pylint: disable=unused-argument
 ) -> None:  # pylint: disable=unused-argument
     window: display.Display = display.Display()
-    window.add_scene(
-        "class_select_menu",
-        cm.create_class_select_menu(*options["args"]),
-    )
+    window.provide_scene("class_select_menu", *options["args"])
     window.set_scene("class_select_menu")
 
 
@@ -40,7 +41,7 @@ def settings(
     options: dict[str, Any],  # pylint: disable=unused-argument
 ) -> None:  # pylint: disable=unused-argument
     window: display.Display = display.Display()
-    window.add_scene("settings_menu", cm.create_settings_menu(*options["args"]))
+    window.provide_scene("settings_menu", *options["args"])
     window.set_scene("settings_menu")
 
 
@@ -62,8 +63,8 @@ def select_class(
     player_class: Optional[player.Player] = None
     window: display.Display = display.Display()
     rect_options: dict[str, Any] = {
-        "x": window.window.get_width() // 2,
-        "y": window.window.get_height() // 2,
+        "x": window.dimensions[0] // 2,
+        "y": window.dimensions[1] // 2,
         "center": True,
     }
     match (options["args"]):
@@ -86,7 +87,7 @@ def select_class(
                 scale=0.3,
             )
     if player_class is not None:
-        window.add_scene("game", cm.create_game_scene(player_class, move_player))
+        window.provide_scene("game", player_class, move_player)
         window.set_scene("game")
 
 
@@ -94,16 +95,18 @@ def move_player(
     event: pygame.event.Event,  # pylint: disable=unused-argument
     options: dict[str, Any],  # pylint: disable=unused-argument
 ) -> None:  # pylint: disable=unused-argument
-    speed: float = 3.5
-    direction: list[int] = [0, 0]
-    if pygame.K_w in event.key and pygame.K_s not in event.key:
-        direction[1] = -1
-    elif pygame.K_w not in event.key and pygame.K_s in event.key:
-        direction[1] = 1
-    if pygame.K_a in event.key and pygame.K_d not in event.key:
-        direction[0] = -1
-    elif pygame.K_a not in event.key and pygame.K_d in event.key:
-        direction[0] = 1
+    # Polled once a tick, so the player moves the same distance every tick a key
+    # is held, whatever the frame rate
+    held: input_state.InputState = display.Display().events.input
+    if held.mods != pygame.KMOD_NONE:
+        return
+    speed: float = 175.0 * (event.delta / 1000)
+    direction: list[int] = [
+        held.axis(pygame.K_a, pygame.K_d),
+        held.axis(pygame.K_w, pygame.K_s),
+    ]
+    if direction == [0, 0]:
+        return
     distance: list[float] = [speed, math.sqrt((speed**2) * 2)]
     match (direction):
         case [0, -1]:
@@ -122,49 +125,88 @@ def move_player(
             options["args"].move(270.0, distance[0])
         case [-1, -1]:
             options["args"].move(315.0, distance[1])
+    keep_in_world(options["args"])
     check_dists(options["args"])
 
 
+def keep_in_world(player_entity: player.Player) -> None:
+    game_scene: scene.Scene = display.Display().scenes["game"]
+    if game_scene.camera is None or game_scene.camera.world is None:
+        return
+    clamped: pygame.Rect = player_entity.design.rect.clamp(game_scene.camera.world)
+    if clamped.topleft != player_entity.design.rect.topleft:
+        player_entity.design.x, player_entity.design.y = clamped.x, clamped.y
+
+
 def check_dists(player_entity: player.Player) -> None:
     window: display.Display = display.Display()
     for e in window.scenes["game"].visible_elements:
         if isinstance(e, entity.Entity):
             distance: float = player_entity.get_distance(e)
             if isinstance(e, enemy.Enemy) and distance <= 50.0:
-                window.add_scene(
-                    "attack",
-                    cm.create_attack_scene(player_entity, e, back),
-                    overwrite=True,
-                )
+                # Later encounters rebind the attack scene rather than building it
+                window.provide_scene("attack", player_entity, e, back)
                 window.set_scene("attack")
 
 
-def init() -> None:
+def init(
+    headless: bool = False,
+    frames: Optional[int] = None,
+    profile_path: Optional[str] = None,
+) -> None:
     width: int = 800
     height: int = 600
     window: display.Display = display.Display(
-        title="Kings Quest", dim=[width, height], key_press_initial_delay=20
+        title="Kings Quest",
+        dim=[width, height],
+        dirty_rects=True,
+        tick_rate=50,
+        max_fps=60,
+        headless=headless,
+        profile=profile_path is not None,
+        profile_path=profile_path,
     )
     pygame.font.init()
     path: pathlib.Path = pathlib.Path.joinpath(
         pathlib.Path.cwd(), "fonts/static/GrenzeGotisch-Regular.ttf"
     )
-    images: list[str] = [
-        "assets/rogue_button.png",
-        "assets/mage_button.png",
-        "assets/warrior_button.png",
-    ]
-    for img in images:
-        utils.get_asset(img)
+    utils.load_atlas(
+        [
+            "assets/skeleton.png",
+            "assets/goblin.png",
+            "assets/orc.png",
+            "assets/mage.png",
+            "assets/rogue.png",
+            "assets/warrior.png",
+            "assets/blue_orb.png",
+        ]
+    )
+    # Decoded in the background while the main menu is up, rather than blocking
+    # before it is shown
+    loader: preloader.Preloader = preloader.Preloader()
+    loader.preload(
+        [
+            *cm.scene_assets["class_select_menu"],
+            *cm.scene_assets["game"],
+            *cm.scene_assets["attack"],
+        ]
+    )
     if path.exists():
         cm.game_fonts = [pygame.font.Font(path, 36), pygame.font.Font(path, 20)]
     else:
         cm.game_fonts = [pygame.font.Font(path, 36), pygame.font.Font(path, 20)]
-    window.add_scene(
-        "main_menu",
-        cm.create_main_menu(width, height, window, play, settings, back, select_class),
+    window.register_scene_type("main_menu", cm.create_main_menu)
+    window.register_scene_type("settings_menu", cm.create_settings_menu)
+    window.register_scene_type("class_select_menu", cm.create_class_select_menu)
+    window.register_scene_type("game", cm.create_game_scene)
+    window.register_scene_type("attack", cm.create_attack_scene)
+    window.provide_scene(
+        "main_menu", width, height, window, play, settings, back, select_class
     )
     window.set_scene("main_menu", no_event=True)
+    if frames is not None:
+        window.step(frames)
+        return
     while True:
         try:
             window.handle_events()
@@ -180,4 +222,23 @@ def init() -> None:
 
 
 if __name__ == "__main__":
-    init()
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog="Kings Quest")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="render offscreen with SDL's dummy video driver, as fast as possible",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=None,
+        help="stop after this many frames instead of running until quit",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        metavar="PATH",
+        help="time each frame phase and write the statistics here (.json or .csv)",
+    )
+    args: argparse.Namespace = parser.parse_args()
+    init(headless=args.headless, frames=args.frames, profile_path=args.profile)
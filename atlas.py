@@ -0,0 +1,122 @@
+import pathlib
+from typing import Optional, Sequence
+
+import pygame
+
+# Every atlas sheet by id, with the key the draw process knows it by. The sheet is
+# kept here too, so the id can't be reused while it is registered
+sheets: dict[int, tuple[pygame.Surface, bytes]] = {}
+
+
+def resolve(
+    surf: pygame.Surface,
+) -> Optional[tuple[pygame.Surface, bytes, pygame.Rect]]:
+    """If surf is a region of an atlas sheet, returns the sheet, its key and the
+    region's rect within it"""
+    parent: pygame.Surface = surf.get_abs_parent()
+    if parent is surf or id(parent) not in sheets:
+        return None
+    sheet, key = sheets[id(parent)]
+    if sheet is not parent:
+        return None
+    return sheet, key, pygame.Rect(surf.get_abs_offset(), surf.get_size())
+
+
+def asset_key(asset_location: str | pathlib.Path) -> str:
+    return pathlib.Path.joinpath(pathlib.Path.cwd(), asset_location).as_posix()
+
+
+class Atlas:
+    def __init__(
+        self,
+        asset_locations: Sequence[str | pathlib.Path],
+        max_size: int = 2048,
+        padding: int = 1,
+    ) -> None:
+        """Packs images into as few sheets as fit, so sprites can share one surface
+        and the draw process only needs each sheet once"""
+        self.max_size = max_size
+        self.padding = padding
+        self.sheets: list[pygame.Surface] = []
+        self.regions: dict[str, tuple[int, pygame.Rect]] = {}
+        images: dict[str, pygame.Surface] = {}
+        for asset_location in asset_locations:
+            absolute_path: pathlib.Path = pathlib.Path.joinpath(
+                pathlib.Path.cwd(), asset_location
+            )
+            if not absolute_path.exists() or not absolute_path.is_file():
+                raise FileNotFoundError(f"Image file not found: {absolute_path}")
+            images[absolute_path.as_posix()] = pygame.image.load(absolute_path)
+        self.pack(images)
+
+    def __contains__(self, asset_location: str | pathlib.Path) -> bool:
+        return asset_key(asset_location) in self.regions
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def pack(self, images: dict[str, pygame.Surface]) -> None:
+        """Shelf packing: the tallest images go first, filling rows left to right, and
+        a new sheet is started when a row no longer fits"""
+        placements: list[list[tuple[str, pygame.Rect]]] = [[]]
+        x: int = 0
+        shelf_y: int = 0
+        shelf_height: int = 0
+        for key, image in sorted(
+            images.items(), key=lambda item: (-item[1].get_height(), item[0])
+        ):
+            width: int = image.get_width() + self.padding * 2
+            height: int = image.get_height() + self.padding * 2
+            if width > self.max_size or height > self.max_size:
+                raise ValueError(
+                    f"{key} is {image.get_size()}, which doesn't fit in a "
+                    f"{self.max_size} by {self.max_size} sheet"
+                )
+            if x + width > self.max_size:
+                x, shelf_y, shelf_height = 0, shelf_y + shelf_height, 0
+            if shelf_y + height > self.max_size:
+                placements.append([])
+                x, shelf_y, shelf_height = 0, 0, 0
+            placements[-1].append(
+                (
+                    key,
+                    pygame.Rect(
+                        x + self.padding,
+                        shelf_y + self.padding,
+                        image.get_width(),
+                        image.get_height(),
+                    ),
+                )
+            )
+            x += width
+            shelf_height = max(shelf_height, height)
+        for placed in placements:
+            if len(placed) == 0:
+                continue
+            sheet: pygame.Surface = pygame.Surface(
+                (
+                    max(rect.right for _, rect in placed) + self.padding,
+                    max(rect.bottom for _, rect in placed) + self.padding,
+                ),
+                pygame.SRCALPHA,
+            ).convert_alpha()
+            sheet.blits(
+                [(images[key], rect) for key, rect in placed],
+                doreturn=False,
+            )
+            for key, rect in placed:
+                self.regions[key] = (len(self.sheets), rect)
+            sheets[id(sheet)] = (sheet, f"atlas:{id(self)}:{len(self.sheets)}".encode())
+            self.sheets.append(sheet)
+
+    def get(self, asset_location: str | pathlib.Path) -> pygame.Surface:
+        """The image as a subsurface of its sheet. It shares the sheet's pixels, so
+        copy it before drawing onto it"""
+        sheet_index, rect = self.regions[asset_key(asset_location)]
+        return self.sheets[sheet_index].subsurface(rect)
+
+    def release(self) -> None:
+        for sheet in self.sheets:
+            sheets.pop(id(sheet), None)
+        self.sheets = []
+        self.regions = {}
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import pathlib
+import sys
+import threading
+from typing import Any, Literal, Optional
+
+import pygame
+
+MANIFEST: str = "assets/bake.json"
+CACHE_DIR: str = "assets/.baked"
+FORMATS: dict[str, Literal["RGB", "RGBA"]] = {"RGB": "RGB", "RGBA": "RGBA"}
+
+
+def source_key(source: pathlib.Path) -> Optional[str]:
+    """How a source image is named in the manifest and the index: relative to the
+    working directory, as that is what assets are loaded relative to"""
+    try:
+        return source.resolve().relative_to(pathlib.Path.cwd()).as_posix()
+    except ValueError:
+        return None
+
+
+def fingerprint(source: pathlib.Path) -> list[int]:
+    stat: os.stat_result = source.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_index(cache_dir: pathlib.Path | str = CACHE_DIR) -> dict[str, dict[str, Any]]:
+    index_path: pathlib.Path = pathlib.Path(cache_dir) / "index.json"
+    if not index_path.is_file():
+        return {}
+    with index_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class BakedIndex:
+    def __init__(self, cache_dir: pathlib.Path | str = CACHE_DIR) -> None:
+        """A cache directory's index, read the first time a variant is looked up.
+        Preloader threads look variants up at the same time, so reading it is locked
+        """
+        self.cache_dir: pathlib.Path = pathlib.Path(cache_dir)
+        self.__entries: Optional[dict[str, dict[str, Any]]] = None
+        self.__lock: threading.Lock = threading.Lock()
+
+    def entries(self) -> dict[str, dict[str, Any]]:
+        with self.__lock:
+            if self.__entries is None:
+                self.__entries = read_index(self.cache_dir)
+            return self.__entries
+
+    def reload(self) -> None:
+        with self.__lock:
+            self.__entries = read_index(self.cache_dir)
+
+    def lookup(
+        self, source: pathlib.Path
+    ) -> Optional[tuple[bytes, tuple[int, int], Literal["RGB", "RGBA"]]]:
+        """The baked variant of source as raw pixels, its size and pixel format, or
+        None if it hasn't been baked or the source has changed since it was"""
+        entries: dict[str, dict[str, Any]] = self.entries()
+        key: Optional[str] = source_key(source)
+        if key is None or key not in entries:
+            return None
+        entry: dict[str, Any] = entries[key]
+        baked: pathlib.Path = self.cache_dir / entry["file"]
+        if entry["source"] != fingerprint(source) or not baked.is_file():
+            return None
+        size: tuple[int, int] = (entry["size"][0], entry["size"][1])
+        return baked.read_bytes(), size, FORMATS[entry["format"]]
+
+
+indexes: dict[pathlib.Path, BakedIndex] = {}
+indexes_lock: threading.Lock = threading.Lock()
+
+
+def index_for(cache_dir: pathlib.Path | str = CACHE_DIR) -> BakedIndex:
+    with indexes_lock:
+        path: pathlib.Path = pathlib.Path(cache_dir).resolve()
+        if path not in indexes:
+            indexes[path] = BakedIndex(path)
+        return indexes[path]
+
+
+def reload(cache_dir: pathlib.Path | str = CACHE_DIR) -> None:
+    index_for(cache_dir).reload()
+
+
+def lookup(
+    source: pathlib.Path, cache_dir: pathlib.Path | str = CACHE_DIR
+) -> Optional[tuple[bytes, tuple[int, int], Literal["RGB", "RGBA"]]]:
+    return index_for(cache_dir).lookup(source)
+
+
+def manifest_entry(name: str, options: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    """The index key and entry a manifest line bakes to"""
+    source: pathlib.Path = pathlib.Path.joinpath(pathlib.Path.cwd(), name)
+    if not source.is_file():
+        raise FileNotFoundError(f"Image file not found: {source}")
+    key: Optional[str] = source_key(source)
+    if key is None:
+        raise ValueError(f"{source} is outside the working directory")
+    pixel_format: str = options.get("format", "RGBA")
+    if pixel_format not in FORMATS:
+        raise ValueError(
+            f"Unknown format for {name}: {pixel_format}. "
+            f"Expected one of {list(FORMATS)}"
+        )
+    return key, {
+        "file": f"{key.replace('/', '__')}.{options['size'][0]}x"
+        f"{options['size'][1]}.{pixel_format.lower()}",
+        "source": fingerprint(source),
+        "size": [options["size"][0], options["size"][1]],
+        "format": pixel_format,
+        "smooth": options.get("smooth", True),
+    }
+
+
+def bake_entry(key: str, entry: dict[str, Any], cache_dir: pathlib.Path) -> None:
+    surf: pygame.Surface = pygame.image.load(key)
+    size: tuple[int, int] = (entry["size"][0], entry["size"][1])
+    if entry["smooth"] and surf.get_bitsize() in (24, 32):
+        surf = pygame.transform.smoothscale(surf, size)
+    else:
+        surf = pygame.transform.scale(surf, size)
+    (cache_dir / entry["file"]).write_bytes(
+        pygame.image.tobytes(surf, FORMATS[entry["format"]])
+    )
+
+
+def bake(
+    manifest_path: pathlib.Path | str = MANIFEST,
+    cache_dir: pathlib.Path | str = CACHE_DIR,
+    force: bool = False,
+) -> list[str]:
+    """Writes a scaled, raw pixel copy of each image in the manifest that is out of
+    date to cache_dir, and lists the ones it wrote"""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest: dict[str, dict[str, Any]] = json.load(f)
+    cache_dir = pathlib.Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    index: dict[str, dict[str, Any]] = read_index(cache_dir)
+    baked: list[str] = []
+    listed: set[str] = set()
+    for name, options in manifest.items():
+        key, entry = manifest_entry(name, options)
+        listed.add(key)
+        if (
+            not force
+            and index.get(key) == entry
+            and (cache_dir / entry["file"]).is_file()
+        ):
+            continue
+        bake_entry(key, entry, cache_dir)
+        old: Optional[dict[str, Any]] = index.get(key)
+        if old is not None and old["file"] != entry["file"]:
+            (cache_dir / old["file"]).unlink(missing_ok=True)
+        index[key] = entry
+        baked.append(key)
+    # Variants whose source has left the manifest would otherwise be served forever
+    for key in [key for key in index if key not in listed]:
+        (cache_dir / index.pop(key)["file"]).unlink(missing_ok=True)
+    with (cache_dir / "index.json").open("w", encoding="utf-8") as f:
+        json.dump(index, f, indent=4)
+    reload(cache_dir)
+    return baked
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Pre-scales the images in a manifest, so the game loads small "
+        "raw variants instead of decoding the full size sources"
+    )
+    parser.add_argument("--manifest", default=MANIFEST)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument(
+        "--force", action="store_true", help="bake everything, even if up to date"
+    )
+    args: argparse.Namespace = parser.parse_args()
+    for baked_key in bake(args.manifest, args.cache_dir, args.force):
+        print(f"baked {baked_key}", file=sys.stderr)
@@ -0,0 +1,414 @@
+import argparse
+import json
+import math
+import os
+import pathlib
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Optional
+
+import pygame
+
+import display
+import dynentity
+import element
+import scene
+import sprite
+
+BACKENDS: list[str] = ["sync", "async"]
+WORKLOADS: list[str] = ["rects", "text", "moving"]
+SIZES: list[int] = [10, 100, 1000, 10000]
+DIMENSIONS: tuple[int, int] = (800, 600)
+
+
+def drift(event: pygame.event.Event, options: dict[str, Any]) -> None:
+    """Moves a benchmark entity along its heading, wrapping at the window edges"""
+    target: dynentity.DynEntity = options["target"]
+    target.move(options["heading"], options["speed"] * event.delta / 1000)
+    target.design.x %= DIMENSIONS[0]
+    target.design.y %= DIMENSIONS[1]
+
+
+def effective_options(workload: str, options: dict[str, bool]) -> dict[str, bool]:
+    """The options a case is actually run with. The moving workload's layer changes
+    every frame, so it is never static"""
+    return {
+        **options,
+        "static_layers": options["static_layers"] and workload != "moving",
+    }
+
+
+def build_scene(workload: str, size: int, static: bool) -> scene.Scene:
+    rng: random.Random = random.Random(size)
+    font: pygame.font.Font = pygame.font.Font(None, 20)
+    bench_scene: scene.Scene = scene.Scene(
+        sprite.Sprite(
+            rect=pygame.Rect(0, 0, DIMENSIONS[0], DIMENSIONS[1]),
+            rect_options={"colour": [30, 30, 30]},
+        )
+    )
+    elements: list[element.Element] = []
+    for i in range(size):
+        position: dict[str, Any] = {
+            "x": rng.randrange(DIMENSIONS[0]),
+            "y": rng.randrange(DIMENSIONS[1]),
+        }
+        colour: list[int] = [rng.randrange(256) for _ in range(3)]
+        if workload == "rects":
+            elements.append(
+                element.Element(
+                    sprite.Sprite(
+                        rect=pygame.Rect(0, 0, 12, 12),
+                        rect_options={"colour": colour, **position},
+                    ),
+                    visible=True,
+                )
+            )
+        elif workload == "text":
+            elements.append(
+                element.Element(
+                    sprite.Sprite(
+                        rect_options=position,
+                        font_options={"text": f"#{i}", "font": font, "colour": colour},
+                    ),
+                    visible=True,
+                )
+            )
+        elif workload == "moving":
+            mover: dynentity.DynEntity = dynentity.DynEntity(
+                sprite.Sprite(
+                    rect=pygame.Rect(0, 0, 12, 12),
+                    rect_options={"colour": colour, **position},
+                ),
+                health=100,
+                visible=True,
+            )
+            mover.register_listener(
+                "sim_tick",
+                drift,
+                {"heading": rng.uniform(0, 360), "speed": rng.uniform(20, 120)},
+            )
+            elements.append(mover)
+        else:
+            raise ValueError(f"Unknown workload: {workload}")
+    bench_scene.elements = [elements]
+    if static:
+        bench_scene.set_layer_static(0)
+    return bench_scene
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    if len(ordered) == 0:
+        return 0.0
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def run_case(
+    backend: str,
+    workload: str,
+    size: int,
+    frames: int,
+    warmup: int,
+    *,
+    options: dict[str, bool],
+) -> dict[str, Any]:
+    """Runs one benchmark case in this process. Display is a Singleton, so every
+    case needs a fresh interpreter, which run_suite() gives it"""
+    options = effective_options(workload, options)
+    if options["dirty_rects"] and backend != "sync":
+        raise ValueError("Only the sync backend can draw dirty rects")
+    if backend == "sync":
+        window: display.Display = display.Display(
+            title="benchmark",
+            dim=DIMENSIONS,
+            dirty_rects=options["dirty_rects"],
+            max_fps=0,
+            headless=True,
+            profile=True,
+        )
+    elif backend == "async":
+        window = display.AsyncDisplay(
+            title="benchmark",
+            dim=DIMENSIONS,
+            max_fps=0,
+            headless=True,
+            profile=True,
+        )
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+    pygame.font.init()
+    build_start: float = time.perf_counter()
+    window.add_scene("bench", build_scene(workload, size, options["static_layers"]))
+    window.set_scene("bench", no_event=True)
+    build_time: float = time.perf_counter() - build_start
+    for _ in range(warmup):
+        window.handle_events()
+    window.profiler.reset()
+    frame_times: list[float] = []
+    run_start: float = time.perf_counter()
+    for _ in range(frames):
+        frame_start: float = time.perf_counter()
+        window.handle_events()
+        frame_times.append((time.perf_counter() - frame_start) * 1000)
+    window.flush()
+    run_time: float = time.perf_counter() - run_start
+    phases: dict[str, float] = {
+        name: summary["mean"]
+        for name, summary in window.profiler.stats()["timings_ms"].items()
+    }
+    if isinstance(window, display.AsyncDisplay):
+        window.runner.executor.shutdown()
+    frame_times.sort()
+    return {
+        "backend": backend,
+        "workload": workload,
+        "elements": size,
+        "options": options,
+        "frames": frames,
+        "fps": frames / run_time,
+        "build_s": build_time,
+        "frame_ms": {
+            "mean": sum(frame_times) / len(frame_times),
+            "p50": percentile(frame_times, 0.5),
+            "p95": percentile(frame_times, 0.95),
+            "p99": percentile(frame_times, 0.99),
+            "max": frame_times[-1],
+        },
+        # ru_maxrss is in kilobytes on Linux. The draw process only shows up in the
+        # children's usage once it has exited
+        "peak_rss_kb": {
+            "main": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "draw_process": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        },
+        "phases_ms": phases,
+    }
+
+
+def option_flags(options: dict[str, bool]) -> list[str]:
+    flags: list[str] = []
+    if not options["static_layers"]:
+        flags.append("--no-static")
+    if options["dirty_rects"]:
+        flags.append("--dirty-rects")
+    return flags
+
+
+def run_isolated(
+    backend: str,
+    workload: str,
+    size: int,
+    frames: int,
+    warmup: int,
+    *,
+    options: dict[str, bool],
+    timeout: Optional[float] = None,
+) -> dict[str, Any]:
+    failure: dict[str, Any] = {
+        "backend": backend,
+        "workload": workload,
+        "elements": size,
+        "options": effective_options(workload, options),
+    }
+    try:
+        proc: subprocess.CompletedProcess = subprocess.run(
+            [
+                sys.executable,
+                pathlib.Path(__file__).as_posix(),
+                "--case",
+                backend,
+                workload,
+                str(size),
+                "--frames",
+                str(frames),
+                "--warmup",
+                str(warmup),
+                *option_flags(options),
+            ],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=timeout,
+            env={**os.environ, "PYGAME_HIDE_SUPPORT_PROMPT": "1"},
+        )
+    except subprocess.TimeoutExpired:
+        return {**failure, "error": f"timed out after {timeout} s"}
+    if proc.returncode != 0:
+        return {**failure, "error": "\n".join(proc.stderr.strip().splitlines()[-1:])}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_suite(
+    backends: list[str],
+    workloads: list[str],
+    sizes: list[int],
+    frames: int,
+    warmup: int,
+    *,
+    options: dict[str, bool],
+    timeout: Optional[float] = None,
+) -> dict[str, Any]:
+    """Runs every case in its own process. Every backend is run with the same
+    options, so their results only differ by how frames reach the window"""
+    results: list[dict[str, Any]] = []
+    for size in sizes:
+        for workload in workloads:
+            for backend in backends:
+                result: dict[str, Any] = run_isolated(
+                    backend,
+                    workload,
+                    size,
+                    frames,
+                    warmup,
+                    options=options,
+                    timeout=timeout,
+                )
+                results.append(result)
+                print(summary_line(result), file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "sdl": ".".join(str(part) for part in pygame.get_sdl_version()),
+            "platform": platform.platform(),
+            "frames": frames,
+            "warmup": warmup,
+            "options": options,
+        },
+        "results": results,
+    }
+
+
+def summary_line(result: dict[str, Any]) -> str:
+    enabled: str = ",".join(
+        name for name, value in result.get("options", {}).items() if value
+    )
+    case: str = (
+        f"{result['backend']:>5} {result['workload']:>6} {result['elements']:>6} "
+        f"[{enabled or 'full redraw'}]"
+    )
+    if "error" in result:
+        return f"{case}  failed: {result['error']}"
+    return (
+        f"{case}  {result['fps']:9.1f} fps  "
+        f"p95 {result['frame_ms']['p95']:8.2f} ms  "
+        f"p99 {result['frame_ms']['p99']:8.2f} ms  "
+        f"rss {result['peak_rss_kb']['main'] / 1024:7.1f} MiB"
+    )
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Lists the cases whose FPS dropped by more than tolerance against baseline.
+    Only cases run with the same options are compared"""
+    previous: dict[tuple[str, str, int, str], dict[str, Any]] = {
+        (r["backend"], r["workload"], r["elements"], json.dumps(r.get("options"))): r
+        for r in baseline["results"]
+        if "error" not in r
+    }
+    regressions: list[str] = []
+    for result in current["results"]:
+        key: tuple[str, str, int, str] = (
+            result["backend"],
+            result["workload"],
+            result["elements"],
+            json.dumps(result.get("options")),
+        )
+        if "error" in result or key not in previous:
+            continue
+        old_fps: float = previous[key]["fps"]
+        if result["fps"] < old_fps * (1 - tolerance):
+            regressions.append(
+                f"{summary_line(result)}  (was {old_fps:.1f} fps)",
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Headless rendering benchmarks for Display and AsyncDisplay"
+    )
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=600,
+        help="seconds before a single case is abandoned and recorded as failed",
+    )
+    parser.add_argument(
+        "--output", default=None, help="write the JSON results here, not stdout"
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="earlier JSON results to compare against, exiting 1 on a regression",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="the fraction of FPS a case may lose before it counts as a regression",
+    )
+    parser.add_argument(
+        "--no-static",
+        action="store_true",
+        help="don't cache the still workloads' layer as a static layer",
+    )
+    parser.add_argument(
+        "--dirty-rects",
+        action="store_true",
+        help="only redraw what changed, which only the sync backend can do",
+    )
+    parser.add_argument(
+        "--case", nargs=3, default=None, metavar=("BACKEND", "WORKLOAD", "SIZE")
+    )
+    args: argparse.Namespace = parser.parse_args()
+    case_options: dict[str, bool] = {
+        "static_layers": not args.no_static,
+        "dirty_rects": args.dirty_rects,
+    }
+    if args.case is not None:
+        print(
+            json.dumps(
+                run_case(
+                    args.case[0],
+                    args.case[1],
+                    int(args.case[2]),
+                    args.frames,
+                    args.warmup,
+                    options=case_options,
+                )
+            )
+        )
+        sys.exit(0)
+    if args.dirty_rects and args.backends != ["sync"]:
+        parser.error("--dirty-rects needs --backends sync")
+    report: dict[str, Any] = run_suite(
+        args.backends,
+        args.workloads,
+        args.sizes,
+        args.frames,
+        args.warmup,
+        options=case_options,
+        timeout=args.timeout,
+    )
+    if args.output is None:
+        print(json.dumps(report, indent=4))
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            found: list[str] = compare(report, json.load(f), args.tolerance)
+        for line in found:
+            print(f"regression: {line}", file=sys.stderr)
+        if len(found) != 0:
+            sys.exit(1)
@@ -0,0 +1,54 @@
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import pygame
+
+if TYPE_CHECKING:
+    import element
+
+
+class Camera:
+    def __init__(
+        self,
+        dimensions: Sequence[int],
+        world_size: Optional[Sequence[int]] = None,
+    ) -> None:
+        """A viewport onto a scene's world, kept inside world_size if it is given"""
+        self.rect: pygame.Rect = pygame.Rect(0, 0, dimensions[0], dimensions[1])
+        self.world: Optional[pygame.Rect] = (
+            None
+            if world_size is None
+            else pygame.Rect(0, 0, world_size[0], world_size[1])
+        )
+        self.target: Optional["element.Element"] = None
+
+    @property
+    def offset(self) -> tuple[int, int]:
+        """What to add to a world position to get its position on screen"""
+        return (-self.rect.x, -self.rect.y)
+
+    def resize(self, dimensions: Sequence[int]) -> None:
+        self.rect.size = (dimensions[0], dimensions[1])
+        self.move_to(self.rect.x, self.rect.y)
+
+    def move_to(self, x: int, y: int) -> None:
+        self.rect.topleft = (x, y)
+        if self.world is not None:
+            # clamp_ip centres the viewport when the world is smaller than it
+            self.rect.clamp_ip(self.world)
+
+    def center_on(self, pos: Sequence[int]) -> None:
+        self.move_to(pos[0] - self.rect.width // 2, pos[1] - self.rect.height // 2)
+
+    def follow(self, target: Optional["element.Element"]) -> None:
+        self.target = target
+        self.update()
+
+    def update(self) -> None:
+        if self.target is not None:
+            self.center_on(self.target.design.rect.center)
+
+    def to_screen(self, rect: pygame.Rect) -> pygame.Rect:
+        return rect.move(self.offset)
+
+    def to_world(self, pos: Sequence[int]) -> tuple[int, int]:
+        return (pos[0] + self.rect.x, pos[1] + self.rect.y)
@@ -3,18 +3,28 @@ import concurrent.futures._base as cf_b
 import concurrent.futures.process as cf_p
 import multiprocessing as mp
 import multiprocessing.synchronize as mp_sync
-import time
-from typing import Any, Optional, Sequence
+import os
+from typing import Any, Callable, Optional, Sequence
 
 import pygame
 
 import draw_process_funcs as dpf
 import element
 import events
+import frame_commands
+import frame_profiler
+import game_clock
 import scene
 import sprite
+import surface_registry
 import utils
 
+# How many preloaded images are converted per frame, so a batch finishing at once
+# doesn't stall a frame
+ASSETS_PER_FRAME: int = 4
+# How many released scenes of each kind are kept to be rebound, rather than rebuilt
+SCENE_POOL_SIZE: int = 2
+
 
 class DrawProps(element.Element, metaclass=utils.Singleton):
     def __init__(
@@ -29,7 +39,11 @@ class DrawProps(element.Element, metaclass=utils.Singleton):
             ]
             self.events = events.Events()
             self.__dimensions: list[mp_sync.Lock | Sequence[int]] = [mp.Lock(), dim]
-            if not from_async:
+            if from_async:
+                # The window lives in the draw process, but converting surfaces
+                # still needs a display mode to be set in this one
+                pygame.display.set_mode((1, 1), pygame.HIDDEN)
+            else:
                 self.__window: list[mp_sync.Lock | pygame.Surface] = [
                     mp.Lock(),
                     pygame.display.set_mode(dim),
@@ -60,8 +74,17 @@ class DrawProps(element.Element, metaclass=utils.Singleton):
     def cur_scene(self, new_scene: scene.Scene) -> None:
         if isinstance(self.__cur_scene[0], mp_sync.Lock):
             with self.__cur_scene[0] as lock:  # pylint: disable=unused-variable
+                old_scene: Optional[scene.Scene] = (
+                    self.__cur_scene[1]
+                    if isinstance(self.__cur_scene[1], scene.Scene)
+                    else None
+                )
                 self.__cur_scene[1] = new_scene
                 self.events.cur_scene = new_scene
+            if old_scene is not new_scene:
+                if old_scene is not None:
+                    old_scene.deactivate()
+                new_scene.activate()
 
     @cur_scene.deleter
     def cur_scene(self) -> None:
@@ -116,23 +139,43 @@ class Display(DrawProps, metaclass=utils.Singleton):
         self,
         title: str = "",
         dim: Sequence[int] = (0, 0),
-        key_press_initial_delay: int = 0,
-        key_press_interval: int = 0,
         from_async: bool = False,
+        *,
+        dirty_rects: bool = False,
+        tick_rate: int = 50,
+        max_fps: int = 25,
+        headless: bool = False,
+        profile: bool = False,
+        profile_path: Optional[str] = None,
     ) -> None:
         if not hasattr(self, "created"):
             self.created: bool = True
+            self.headless = headless
+            self.profiler: frame_profiler.FrameProfiler = frame_profiler.FrameProfiler(
+                enabled=profile, dump_path=profile_path
+            )
+            if self.headless:
+                # Must be set before the display module is initialised
+                os.environ["SDL_VIDEODRIVER"] = "dummy"
+                os.environ["SDL_AUDIODRIVER"] = "dummy"
             self.scenes: dict[str, scene.Scene] = {}
-            self.clock: pygame.time.Clock = pygame.time.Clock()
-            self.delta: list[int] = [0]
+            self.scene_types: dict[str, Callable[..., scene.Scene]] = {}
+            self.scene_pool: dict[str, list[scene.Scene]] = {}
+            self.game_clock: game_clock.GameClock = game_clock.GameClock(
+                tick_rate=tick_rate,
+                max_fps=0 if self.headless else max_fps,
+                frame_time=1000 / tick_rate if self.headless else None,
+            )
+            self.dirty_rects = dirty_rects
+            self.__drawn_scene: Optional[scene.Scene] = None
+            self.__drawn_rects: dict[element.Element, pygame.Rect] = {}
+            self.__drawn_viewport: Optional[pygame.Rect] = None
+            self.__drawn_layout: int = -1
             if not from_async:
                 pygame.init()
             super().__init__(dim=dim, from_async=from_async)
             pygame.display.set_caption(title)
             self.game_over: bool = False
-            self.__key_press_leftover_delta: int = 0
-            if not from_async:
-                self.events.set_key_repeat(key_press_initial_delay, key_press_interval)
 
     def set_scene(self, new_scene: str, no_event: bool = False) -> None:
         if new_scene in self.scenes:
@@ -177,84 +220,357 @@ class Display(DrawProps, metaclass=utils.Singleton):
             )
         return name in self.scenes
 
-    def update(self, delta: list[int]) -> None:
-        self.__key_press_leftover_delta = self.events.create_key_press_event(
-            delta[len(delta) - 1] + self.__key_press_leftover_delta
-        )
+    def register_scene_type(
+        self, kind: str, create: Callable[..., scene.Scene]
+    ) -> None:
+        """Names a scene builder, so provide_scene() can build scenes of that kind"""
+        self.scene_types[kind] = create
+
+    def provide_scene(
+        self, name: str, *data: Any, kind: Optional[str] = None
+    ) -> scene.Scene:
+        """The scene called name, of kind, showing data. It is kept, rebound or
+        taken from the pool if it can be, and only otherwise built"""
+        kind = name if kind is None else kind
+        if kind not in self.scene_types:
+            raise KeyError(f'No scene type "{kind}" has been registered')
+        existing: Optional[scene.Scene] = self.scenes.get(name)
+        if existing is not None and existing.kind == kind:
+            if existing.data == data:
+                return existing
+            if existing.binder is not None:
+                existing.rebind(*data)
+                return existing
+        if existing is not None:
+            self.release_scene(name)
+        pool: list[scene.Scene] = self.scene_pool.get(kind, [])
+        if len(pool) > 0:
+            provided: scene.Scene = pool.pop()
+            provided.rebind(*data)
+        else:
+            provided = self.scene_types[kind](*data)
+            provided.kind = kind
+            provided.data = data
+        self.scenes[name] = provided
+        return provided
+
+    def release_scene(self, name: str) -> None:
+        """Removes a scene from the Display, pooling it if it can be rebound"""
+        released: scene.Scene = self.scenes[name]
+        if released is self.cur_scene:
+            raise ValueError(f'Scene "{name}" is showing, so it can\'t be released')
+        del self.scenes[name]
+        if released.kind is not None and released.binder is not None:
+            pool: list[scene.Scene] = self.scene_pool.setdefault(released.kind, [])
+            if len(pool) < SCENE_POOL_SIZE:
+                pool.append(released)
+                return
+        released.dispose()
+
+    def update(self, delta: float) -> None:
+        if self.cur_scene is not None:
+            self.events.notify(
+                pygame.event.Event(self.events.event_types["sim_tick"], delta=delta),
+                self.cur_scene.all_listeners,
+            )
+        # Held keys carry over to the next tick, but presses and releases don't
+        self.events.input.end_tick()
+
+    def simulate(self) -> None:
+        # The clock sleeps here to cap the frame rate, so it gets its own phase
+        with self.profiler.phase("clock_wait"):
+            steps: int = self.game_clock.tick()
+        with self.profiler.phase("simulate"):
+            for _ in range(steps):
+                self.update(self.game_clock.step)
+        self.profiler.count("sim_steps", steps)
 
     def handle_events(self) -> None:
         if self.cur_scene is not None:
-            self.draw(self)
-            self.cur_scene.get_all_listeners(self)
-            for e in pygame.event.get():
-                if self.cur_scene is not None:
-                    self.events.notify(e, self.cur_scene.all_listeners)
-                if e.type == self.events.event_types["switch_scene"]:
-                    if e.new_scene is not None:
-                        self.cur_scene = e.new_scene[1]
-
-    def draw(self, window: DrawProps) -> None:
+            with self.profiler.phase("frame"):
+                with self.profiler.phase("listeners"):
+                    self.cur_scene.sync_listeners(self)
+                with self.profiler.phase("assets"):
+                    utils.finish_loading(limit=ASSETS_PER_FRAME)
+                with self.profiler.phase("event_drain"):
+                    frame_events: list[pygame.event.Event] = pygame.event.get()
+                with self.profiler.phase("dispatch"):
+                    for e in frame_events:
+                        self.dispatch_event(e)
+                self.simulate()
+                with self.profiler.phase("draw"):
+                    self.draw(self)
+            self.profiler.end_frame()
+
+    def step(
+        self,
+        n_frames: int = 1,
+        injected_events: Optional[
+            Sequence[pygame.event.Event] | dict[int, Sequence[pygame.event.Event]]
+        ] = None,
+    ) -> None:
+        """Run a fixed number of frames, for headless runs. injected_events are
+        posted before the first frame, or by frame number if given as a dict"""
+        if self.cur_scene is None:
+            raise ValueError("A scene must be set before stepping the Display")
+        for frame in range(n_frames):
+            frame_events: Sequence[pygame.event.Event] = []
+            if isinstance(injected_events, dict):
+                frame_events = injected_events.get(frame, [])
+            elif injected_events is not None and frame == 0:
+                frame_events = injected_events
+            for evt in frame_events:
+                pygame.event.post(evt)
+            self.handle_events()
+        self.flush()
+
+    def flush(self) -> None:
+        pass
+
+    def dispatch_event(self, e: pygame.event.Event) -> None:
+        if self.cur_scene is not None:
+            self.events.notify(e, self.cur_scene.all_listeners)
+        if e.type == self.events.event_types["switch_scene"]:
+            if e.new_scene is not None:
+                self.cur_scene = e.new_scene[1]
+                e.new_scene[1].sync_listeners(self)
+
+    def draw(
+        self,
+        window: DrawProps,
+        offset: Sequence[int] = (0, 0),  # pylint: disable=unused-argument
+    ) -> None:
         if self.cur_scene is not None:
-            self.delta.append(self.clock.tick(25))
-            if len(self.delta) > 10:
-                self.delta = self.delta[(len(self.delta) - 10) :]
+            if self.cur_scene is not self.__drawn_scene:
+                self.cur_scene.invalidate_static()
+            if self.dirty_rects:
+                self.draw_dirty(self.cur_scene)
+                return
+            if self.profiler.enabled:
+                self.count_elements(self.cur_scene)
+            with self.profiler.phase("cull"):
+                self.cur_scene.cull(self.dimensions)
+            with self.profiler.phase("static_cache"):
+                self.cur_scene.refresh_static_cache(self.dimensions)
+            self.__drawn_scene = self.cur_scene
             self.window.fill([0, 0, 0])
-            self.cur_scene.design.rect = self.window.blit(
-                self.cur_scene.design.surf,
-                pygame.Rect(0, 0, self.dimensions[0], self.dimensions[1]),
-            )
+            if not self.cur_scene.caches_background:
+                self.window.blit(
+                    self.cur_scene.design.surf,
+                    (0, 0),
+                    self.cur_scene.viewport(self.dimensions),
+                )
             if self.cur_scene.elements != [None]:
-                for element_layer in self.cur_scene.elements:
-                    for e in element_layer:
-                        e.draw(self)
-            self.update(self.delta)
-            pygame.display.flip()
+                for layer, cache, element_layer in self.cur_scene.render_groups():
+                    layer_offset: tuple[int, int] = self.cur_scene.offset(layer)
+                    with self.profiler.phase(f"layer_{layer}"):
+                        if cache is not None:
+                            self.window.blit(cache, (0, 0))
+                        for e in element_layer:
+                            e.draw(self, layer_offset)
+            with self.profiler.phase("flip"):
+                pygame.display.flip()
+
+    def count_elements(self, cur_scene: scene.Scene) -> None:
+        total: int = 0
+        for layer, element_layer in enumerate(cur_scene.elements):
+            self.profiler.count(f"layer_{layer}", len(element_layer))
+            total += len(element_layer)
+        self.profiler.count("elements", total)
+
+    def collect_dirty_rects(
+        self, cur_scene: scene.Scene, culled: list[list[element.Element]]
+    ) -> list[pygame.Rect]:
+        """Works out which parts of the screen changed since the last frame. Only
+        the elements the scene saw move, change, or come into or go out of view are
+        looked at, so elements that sit still cost nothing"""
+        screen: pygame.Rect = pygame.Rect(0, 0, self.dimensions[0], self.dimensions[1])
+        viewport: pygame.Rect = cur_scene.viewport(self.dimensions)
+        changed: list[tuple[element.Element, Optional[int]]] = cur_scene.take_changed()
+        if (
+            cur_scene is not self.__drawn_scene
+            or cur_scene.design.dirty
+            or viewport != self.__drawn_viewport
+            or cur_scene.layout_version != self.__drawn_layout
+        ):
+            drawn_rects: dict[element.Element, pygame.Rect] = {}
+            for layer, element_layer in enumerate(culled):
+                offset: tuple[int, int] = cur_scene.offset(layer)
+                for e in element_layer:
+                    drawn_rects[e] = e.screen_rect.move(offset)
+            self.__drawn_rects = drawn_rects
+            self.__drawn_viewport = viewport.copy()
+            self.__drawn_layout = cur_scene.layout_version
+            return [screen]
+        dirty: list[pygame.Rect] = []
+        for e, shown_on in changed:
+            old_rect: Optional[pygame.Rect] = self.__drawn_rects.pop(e, None)
+            if old_rect is not None:
+                dirty.append(old_rect)
+            if shown_on is not None:
+                new_rect: pygame.Rect = e.screen_rect.move(cur_scene.offset(shown_on))
+                self.__drawn_rects[e] = new_rect
+                dirty.append(new_rect)
+        return [rect.clip(screen) for rect in self.merge_rects(dirty)]
+
+    @staticmethod
+    def merge_rects(rects: list[pygame.Rect]) -> list[pygame.Rect]:
+        merged: list[pygame.Rect] = []
+        for rect in rects:
+            if rect.width <= 0 or rect.height <= 0:
+                continue
+            rect = rect.copy()
+            i: int = rect.collidelist(merged)
+            while i != -1:
+                rect.union_ip(merged.pop(i))
+                i = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def draw_dirty(self, cur_scene: scene.Scene) -> None:
+        if self.profiler.enabled:
+            self.count_elements(cur_scene)
+        with self.profiler.phase("cull"):
+            culled: list[list[element.Element]] = cur_scene.cull(self.dimensions)
+        with self.profiler.phase("collect_dirty"):
+            regions: list[pygame.Rect] = self.collect_dirty_rects(cur_scene, culled)
+        self.profiler.count("dirty_regions", len(regions))
+        with self.profiler.phase("static_cache"):
+            cur_scene.refresh_static_cache(self.dimensions)
+        self.__drawn_scene = cur_scene
+        viewport: pygame.Rect = cur_scene.viewport(self.dimensions)
+        for region in regions:
+            self.window.set_clip(region)
+            if not cur_scene.caches_background:
+                self.window.fill([0, 0, 0])
+                self.window.blit(cur_scene.design.surf, (0, 0), viewport)
+            # Only the elements over the region are drawn, found through the index
+            found: list[list[element.Element]] = cur_scene.overlapping(region)
+            for layer, cache, _ in cur_scene.render_groups():
+                offset: tuple[int, int] = cur_scene.offset(layer)
+                with self.profiler.phase(f"layer_{layer}", accumulate=True):
+                    if cache is not None:
+                        self.window.blit(cache, (0, 0))
+                        continue
+                    for e in found[layer]:
+                        e.blit(self, offset)
+        self.window.set_clip(None)
+        cur_scene.mark_clean()
+        if len(regions) != 0:
+            with self.profiler.phase("flip"):
+                pygame.display.update(regions)
 
 
 class AsyncDisplay(Display, metaclass=utils.Singleton):
     def __init__(
-        self, title: str = "", dim: Sequence[int] = (0, 0), start_method: str = "fork"
+        self,
+        title: str = "",
+        dim: Sequence[int] = (0, 0),
+        start_method: str = "fork",
+        *,
+        surface_cap: int = 64 * 1024 * 1024,
+        headless: bool = False,
+        tick_rate: int = 50,
+        max_fps: int = 25,
+        profile: bool = False,
+        profile_path: Optional[str] = None,
     ) -> None:
         if not hasattr(self, "ready"):
             self.ready = False
-            super().__init__(title=title, dim=dim, from_async=True)
+            # Game code looks the window up with display.Display(), which has to
+            # find this instance rather than build a second, synchronous one
+            utils.Singleton.register(Display, self)
+            super().__init__(
+                title=title,
+                dim=dim,
+                from_async=True,
+                tick_rate=tick_rate,
+                max_fps=max_fps,
+                headless=headless,
+                profile=profile,
+                profile_path=profile_path,
+            )
             self.runner: utils.AsyncRunner = utils.AsyncRunner(
-                "display", start_method=start_method, initfunc=dpf.init, initargs=(dim,)
+                "display",
+                start_method=start_method,
+                initfunc=dpf.init,
+                initargs=(dim,),
             )
+            self.surfaces: surface_registry.SurfaceRegistry = (
+                surface_registry.SurfaceRegistry()
+            )
+            self.surfaces.cap = surface_cap
             self.executor = self.runner.executor
             self.dimensions = dim
+            self.__frame: Optional[tuple[frame_commands.FrameCommands, cf_b.Future]] = (
+                None
+            )
+            self.__worker_events: list[tuple[int, dict[str, Any]]] = []
             self.ready = True
 
-    def event_callback(self, fut: cf_b.Future) -> None:
-        if self.cur_scene is not None:
-            events_list: list[tuple[int, dict[str, Any]]] = fut.result()
-            for evt in events_list:
-                self.events.notify(
-                    pygame.event.Event(evt[0], evt[1]), self.cur_scene.all_listeners
-                )
+    def event_callback(self, events_list: list[tuple[int, dict[str, Any]]]) -> None:
+        self.__worker_events.extend(events_list)
 
     def handle_events(self) -> None:
         if self.cur_scene is not None:
-            self.draw(self)
-            self.cur_scene.get_all_listeners(self)
-            events_fut = self.runner.executor.submit(dpf.get_events)
-            events_fut.add_done_callback(self.event_callback)
-            time.sleep(0.04)
+            with self.profiler.phase("frame"):
+                with self.profiler.phase("listeners"):
+                    self.cur_scene.sync_listeners(self)
+                with self.profiler.phase("assets"):
+                    utils.finish_loading(limit=ASSETS_PER_FRAME)
+                # Waiting on the draw process covers its blits and flip
+                with self.profiler.phase("flush"):
+                    self.flush()
+                with self.profiler.phase("event_drain"):
+                    worker_events: list[tuple[int, dict[str, Any]]] = (
+                        self.__worker_events
+                    )
+                    self.__worker_events = []
+                    frame_events: list[pygame.event.Event] = pygame.event.get()
+                with self.profiler.phase("dispatch"):
+                    for evt in worker_events:
+                        self.dispatch_event(pygame.event.Event(evt[0], evt[1]))
+                    for e in frame_events:
+                        self.dispatch_event(e)
+                self.simulate()
+                with self.profiler.phase("draw"):
+                    self.draw(self)
+            self.profiler.end_frame()
+
+    def flush(self) -> None:
+        if self.__frame is not None:
+            self.__frame[0].dispatch(self.__frame[1])
+            self.surfaces.frame_done()
+            self.__frame = None
 
-    def update_rect(self, future: cf_b.Future) -> None:
+    def update_rect(self, res: Optional[pygame.Rect]) -> None:
         if self.cur_scene is None:
             raise ValueError(
                 "No scene set, please set this first with "
                 "AsyncDisplay.set_scene(scene_name) first."
             )
-        self.cur_scene.design.rect = future.result(0.05)
+        if res is None:
+            if self.cur_scene.handle is not None:
+                self.surfaces.mark_evicted(self.cur_scene.handle)
+            return
+        if res != self.cur_scene.design.rect:
+            self.cur_scene.design.rect = res
+
+    def residency(self) -> dict[str, Any]:
+        return {
+            "worker": self.runner.executor.submit(dpf.registry_stats).result(),
+            **self.surfaces.stats(),
+        }
 
-    def draw(self, window: DrawProps) -> None:
+    def draw(
+        self,
+        window: DrawProps,
+        offset: Sequence[int] = (0, 0),  # pylint: disable=unused-argument
+    ) -> None:
         if self.cur_scene is not None:
-            self.delta.append(self.clock.tick(25))
-            if len(self.delta) > 10:
-                self.delta = self.delta[(len(self.delta) - 10) :]
-            self.runner.executor.submit(dpf.fill_screen, [0, 0, 0])
+            commands: frame_commands.FrameCommands = frame_commands.FrameCommands()
+            self.surfaces.start_frame(commands)
+            commands.fill([0, 0, 0])
             if (
                 self.cur_scene.design.surf.get_width() != self.dimensions[0]
                 or self.cur_scene.design.surf.get_height() != self.dimensions[1]
@@ -269,27 +585,32 @@ class AsyncDisplay(Display, metaclass=utils.Singleton):
                         self.dimensions[1],
                     ),
                 )
-                self.cur_scene.bytes = (
-                    pygame.image.tobytes(self.cur_scene.design.surf, "RGBA"),
-                    [
-                        self.cur_scene.design.width,
-                        self.cur_scene.design.height,
-                    ],
-                    "RGBA",
+            with self.profiler.phase("cull"):
+                self.cur_scene.cull(self.dimensions)
+            with self.profiler.phase("static_cache"):
+                self.cur_scene.refresh_static_cache(self.dimensions)
+            if not self.cur_scene.caches_background:
+                commands.blit(
+                    self.cur_scene.sync_handle(commands),
+                    pygame.Rect(0, 0, self.dimensions[0], self.dimensions[1]),
+                    self.cur_scene.viewport(self.dimensions),
+                    callback=self.update_rect,
                 )
-            screen_flush: cf_b.Future = self.runner.executor.submit(
-                dpf.construct_and_blit,
-                (
-                    self.cur_scene.bytes[0],
-                    self.cur_scene.bytes[1],
-                    self.cur_scene.bytes[2],
-                ),
-                pygame.Rect(0, 0, self.dimensions[0], self.dimensions[1]),
-            )
-            screen_flush.add_done_callback(self.update_rect)
             if self.cur_scene.elements != [None]:
-                for element_layer in self.cur_scene.elements:
-                    for e in element_layer:
-                        e.draw_async(self.runner.executor, self.dimensions)
-            self.update(self.delta)
-            self.runner.executor.submit(pygame.display.flip)
+                if self.profiler.enabled:
+                    self.count_elements(self.cur_scene)
+                for layer, cache, element_layer in self.cur_scene.render_groups():
+                    layer_offset: tuple[int, int] = self.cur_scene.offset(layer)
+                    with self.profiler.phase(f"layer_{layer}"):
+                        if cache is not None:
+                            self.cur_scene.draw_static_async(
+                                layer, commands, self.dimensions
+                            )
+                        for e in element_layer:
+                            e.draw_async(commands, self.dimensions, layer_offset)
+            commands.flip()
+            commands.get_events(self.event_callback)
+            self.profiler.count("commands", len(commands))
+            with self.profiler.phase("submit"):
+                self.__frame = (commands, commands.submit(self.runner.executor))
+            self.surfaces.submitted()
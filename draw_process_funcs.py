@@ -3,6 +3,17 @@ from typing import Any, Literal, Optional, Sequence
 
 import pygame
 
+import shared_surface
+
+shared_surfaces: dict[str, shared_surface.SharedSurface] = {}
+# Surfaces are only freed when the main process's SurfaceRegistry says so, as it
+# decides what stays resident
+surface_registry: dict[int, pygame.Surface] = {}
+registry_info: dict[str, int] = {
+    "bytes": 0,
+    "uploads": 0,
+}
+
 
 def init(dim: Sequence[int]) -> None:
     pygame.init()
@@ -11,6 +22,32 @@ def init(dim: Sequence[int]) -> None:
     pygame.key.set_repeat(25)
 
 
+def surface_size(surf: pygame.Surface) -> int:
+    return surf.get_pitch() * surf.get_height()
+
+
+def upload_surface(handle: int, source: tuple[str, Sequence[int]]) -> None:
+    surf: pygame.Surface = attach_shared(source).convert_alpha()
+    release_shared(source[0])
+    free_surface(handle)
+    surface_registry[handle] = surf
+    registry_info["bytes"] += surface_size(surf)
+    registry_info["uploads"] += 1
+
+
+def free_surface(handle: int) -> None:
+    if handle in surface_registry:
+        registry_info["bytes"] -= surface_size(surface_registry.pop(handle))
+
+
+def get_surface(handle: int) -> Optional[pygame.Surface]:
+    return surface_registry.get(handle)
+
+
+def registry_stats() -> dict[str, int]:
+    return {"entries": len(surface_registry), **registry_info}
+
+
 def construct_and_blit(
     surf_as_bytes: tuple[
         bytes,
@@ -29,6 +66,54 @@ def construct_and_blit(
     return window.blit(surf, rect, mask)  # type: ignore[name-defined]
 
 
+def attach_shared(handle: tuple[str, Sequence[int]]) -> pygame.Surface:
+    name, size = handle
+    if name not in shared_surfaces or shared_surfaces[name].size != tuple(size):
+        shared_surfaces[name] = shared_surface.SharedSurface(size, name=name)
+    return shared_surfaces[name].view()
+
+
+def release_shared(name: str) -> None:
+    if name in shared_surfaces:
+        shared_surfaces.pop(name).close()
+
+
+def run_frame(commands: list[tuple[Any, ...]]) -> list[Any]:
+    results: list[Any] = [None] * len(commands)
+    i: int = 0
+    while i < len(commands):
+        if commands[i][0] == "blit":
+            resident: list[int] = []
+            blits: list[tuple[pygame.Surface, pygame.Rect, Optional[pygame.Rect]]] = []
+            while i < len(commands) and commands[i][0] == "blit":
+                surf: Optional[pygame.Surface] = get_surface(commands[i][1])
+                if surf is not None:
+                    resident.append(i)
+                    blits.append((surf, commands[i][2], commands[i][3]))
+                i += 1
+            rects = window.blits(blits)  # type: ignore[name-defined]
+            for j, rect in zip(resident, rects):
+                results[j] = rect
+            continue
+        match (commands[i]):
+            case ("upload", handle, source):
+                upload_surface(handle, source)
+            case ("free", handle):
+                free_surface(handle)
+            case ("fill", colour):
+                results[i] = fill_screen(colour)
+            case ("release", name):
+                release_shared(name)
+            case ("flip",):
+                pygame.display.flip()
+            case ("events",):
+                results[i] = get_events()
+            case _:
+                raise ValueError(f"Unknown draw command: {commands[i]}")
+        i += 1
+    return results
+
+
 def fill_screen(colour: Sequence[int] | tuple[int, int, int]) -> pygame.Rect:
     global window  # pylint: disable=global-variable-not-assigned
     return window.fill(color=colour)  # type: ignore[name-defined]
@@ -55,7 +140,7 @@ def convert(
         bytes,
         Sequence[int] | tuple[int, int],
         Literal["P", "RGB", "RGBX", "RGBA", "ARGB", "BGRA"],
-    ]
+    ],
 ) -> tuple[
     bytes,
     Sequence[int] | tuple[int, int],
@@ -1,19 +1,34 @@
-import concurrent.futures._base as cf_b
-import concurrent.futures.process as cf_p
 import functools
 import multiprocessing as mp
 import multiprocessing.synchronize as mp_sync
-from typing import TYPE_CHECKING, Any, Callable, Literal, Optional, Sequence
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
 
 import pygame
 
-import draw_process_funcs as dpf
+import atlas
 import events
+import frame_commands
 import sprite
+import surface_registry
 
 if TYPE_CHECKING:
     import display
 
+# Told the event type, function and options of a listener, and whether it was added
+# or removed
+ListenerWatcher = Callable[
+    [
+        int,
+        Callable[
+            [pygame.event.Event, dict[str, Any]], Optional[functools.partial[None]]
+        ],
+        dict[str, Any],
+        bool,
+    ],
+    None,
+]
+
 
 class ListenerHolder:
     def __init__(self) -> None:
@@ -27,6 +42,29 @@ class ListenerHolder:
                 dict[str, Any],
             ],
         ] = {}
+        self.__listener_watchers: list[ListenerWatcher] = []
+
+    def watch_listeners(self, watcher: ListenerWatcher) -> None:
+        """Calls watcher with the event type, function, options and whether it was
+        added, whenever a listener is registered or deregistered"""
+        if watcher not in self.__listener_watchers:
+            self.__listener_watchers.append(watcher)
+
+    def unwatch_listeners(self, watcher: ListenerWatcher) -> None:
+        if watcher in self.__listener_watchers:
+            self.__listener_watchers.remove(watcher)
+
+    def __listener_changed(
+        self,
+        event_type: int,
+        func: Callable[
+            [pygame.event.Event, dict[str, Any]], Optional[functools.partial[None]]
+        ],
+        options: dict[str, Any],
+        added: bool,
+    ) -> None:
+        for watcher in list(self.__listener_watchers):
+            watcher(event_type, func, options, added)
 
     def register_listener(
         self,
@@ -46,7 +84,11 @@ class ListenerHolder:
         if options is None:
             options = {}
         options["target"] = self
+        replaced: Optional[dict[str, Any]] = self.listeners[evt_type].get(func)
         self.listeners[evt_type][func] = options
+        if replaced is not None:
+            self.__listener_changed(evt_type, func, replaced, False)
+        self.__listener_changed(evt_type, func, options, True)
 
     def deregister_listener(
         self,
@@ -61,9 +103,10 @@ class ListenerHolder:
         else:
             evt_type = event_type
         try:
-            del self.listeners[evt_type][func]
+            removed: dict[str, Any] = self.listeners[evt_type].pop(func)
         except KeyError as e:  # pylint: disable=unused-variable
-            pass
+            return
+        self.__listener_changed(evt_type, func, removed, False)
 
 
 class Element(ListenerHolder):
@@ -77,16 +120,10 @@ class Element(ListenerHolder):
         self.__design: list[mp_sync.Lock | sprite.Sprite] = [mp.Lock(), design]
         self.mask = mask
         self.visible = visible
-        if self.design.is_async:
-            self.bytes: tuple[
-                bytes,
-                Sequence[int],
-                Literal["P", "RGB", "RGBX", "RGBA", "ARGB", "BGRA"],
-            ] = (
-                pygame.image.tobytes(self.design.surf, "RGBA"),
-                [self.design.width, self.design.height],
-                "RGBA",
-            )
+        self.handle: Optional[int] = None
+        self.__handle_version: tuple[int, int] = (-1, -1)
+        self.__handle_finalizer: Optional[weakref.finalize] = None
+        self.__watchers: list[Callable[[Element], None]] = []
 
     @property
     def design(self) -> sprite.Sprite:
@@ -101,48 +138,131 @@ class Element(ListenerHolder):
     def design(self, new_design: sprite.Sprite) -> None:
         if isinstance(self.__design[0], mp_sync.Lock):
             with self.__design[0] as lock:  # pylint: disable=unused-variable
+                old_design: mp_sync.Lock | sprite.Sprite = self.__design[1]
                 self.__design[1] = new_design
-                self.bytes = (
-                    pygame.image.tobytes(self.design.surf, "RGBA"),
-                    [self.design.width, self.design.height],
-                    "RGBA",
-                )
+            if len(self.__watchers) != 0:
+                if isinstance(old_design, sprite.Sprite):
+                    old_design.unwatch(self.__design_changed)
+                new_design.watch(self.__design_changed)
+                self.__design_changed()
 
     @design.deleter
     def design(self) -> None:
         del self.__design
 
-    def update_rect(self, future: cf_b.Future) -> None:
-        res: pygame.Rect = future.result(0.01)
-        self.design.x, self.design.y = res.x, res.y
+    def watch(self, watcher: Callable[["Element"], None]) -> None:
+        """Calls watcher with this element whenever its design moves or changes,
+        including when the design is swapped for another sprite"""
+        if len(self.__watchers) == 0:
+            self.design.watch(self.__design_changed)
+        if watcher not in self.__watchers:
+            self.__watchers.append(watcher)
+
+    def unwatch(self, watcher: Callable[["Element"], None]) -> None:
+        if watcher in self.__watchers:
+            self.__watchers.remove(watcher)
+        if len(self.__watchers) == 0:
+            self.design.unwatch(self.__design_changed)
+
+    def __design_changed(self) -> None:
+        for watcher in self.__watchers:
+            watcher(self)
+
+    @property
+    def screen_rect(self) -> pygame.Rect:
+        area: pygame.Rect = self.design.surf.get_rect()
+        if self.mask is not None:
+            area = area.clip(self.mask)
+        return pygame.Rect(
+            self.design.rect.x, self.design.rect.y, area.width, area.height
+        )
+
+    @property
+    def dirty(self) -> bool:
+        return self.design.dirty
+
+    def mark_clean(self) -> None:
+        self.design.dirty = False
+
+    def is_on_screen(self, dimensions: Sequence[int]) -> bool:
+        return ((0 - self.design.width) < self.design.rect.x < dimensions[0]) and (
+            (0 - self.design.height) < self.design.rect.y < dimensions[1]
+        )
+
+    def blit(
+        self, window: "display.DrawProps", offset: Sequence[int] = (0, 0)
+    ) -> pygame.Rect:
+        return window.window.blit(
+            self.design.surf, self.design.rect.move(offset), self.mask
+        )
+
+    def sync_handle(self, commands: frame_commands.FrameCommands) -> int:
+        registry: surface_registry.SurfaceRegistry = surface_registry.SurfaceRegistry()
+        # Fetched before the version, as a lazily rendered surface bumps it
+        surf: pygame.Surface = self.design.surf
+        version: tuple[int, int] = (id(self.design), self.design.version)
+        key: Optional[bytes] = None
+        # Atlas regions share their sheet's handle, so the sheet is uploaded once
+        region: Optional[tuple[pygame.Surface, bytes, pygame.Rect]] = atlas.resolve(
+            surf
+        )
+        if region is not None:
+            surf, key = region[0], region[1]
+        if self.handle is not None and self.__handle_version == version:
+            registry.ensure_resident(self.handle, surf, commands)
+            return self.handle
+        if self.handle is None:
+            self.handle = registry.acquire(surf, commands, key)
+        else:
+            self.handle = registry.replace(self.handle, surf, commands, key)
+        self.__handle_version = version
+        if self.__handle_finalizer is not None:
+            self.__handle_finalizer.detach()
+        self.__handle_finalizer = weakref.finalize(self, registry.release, self.handle)
+        return self.handle
+
+    def update_rect(self, res: Optional[pygame.Rect]) -> None:
+        # The blitted rect is clipped to the window, so it is not written back to
+        # the design, which may be partly off screen or offset by a camera
+        if res is None and self.handle is not None:
+            surface_registry.SurfaceRegistry().mark_evicted(self.handle)
 
     def draw_async(
         self,
-        executor: cf_p.ProcessPoolExecutor,
+        commands: frame_commands.FrameCommands,
         dimensions: Sequence[int],
+        offset: Sequence[int] = (0, 0),
     ) -> None:
-        self.visible = ((0 - self.design.width) < self.design.x < dimensions[0]) and (
-            (0 - self.design.height) < self.design.y < dimensions[1]
+        x: int = self.design.x + offset[0]
+        y: int = self.design.y + offset[1]
+        self.visible = ((0 - self.design.width) < x < dimensions[0]) and (
+            (0 - self.design.height) < y < dimensions[1]
         )
         if self.visible:
-            future: cf_b.Future = executor.submit(
-                dpf.construct_and_blit,
-                (
-                    self.bytes[0],
-                    self.bytes[1],
-                    self.bytes[2],
-                ),
-                self.design.rect,
-                self.mask,
+            area: Optional[pygame.Rect] = self.mask
+            region: Optional[tuple[pygame.Surface, bytes, pygame.Rect]] = atlas.resolve(
+                self.design.surf
+            )
+            if region is not None:
+                area = (
+                    region[2]
+                    if self.mask is None
+                    else self.mask.move(region[2].topleft).clip(region[2])
+                )
+            commands.blit(
+                self.sync_handle(commands),
+                self.design.rect.move(offset),
+                area,
+                self.update_rect,
             )
-            future.add_done_callback(self.update_rect)
 
-    def draw(self, window: "display.DrawProps") -> None:
-        self.visible = (
-            (0 - self.design.width) < self.design.x < window.dimensions[0]
-        ) and ((0 - self.design.height) < self.design.y < window.dimensions[1])
+    def draw(self, window: "display.DrawProps", offset: Sequence[int] = (0, 0)) -> None:
+        x: int = self.design.x + offset[0]
+        y: int = self.design.y + offset[1]
+        self.visible = ((0 - self.design.width) < x < window.dimensions[0]) and (
+            (0 - self.design.height) < y < window.dimensions[1]
+        )
         if self.visible:
-            new_rect: pygame.Rect = window.window.blit(
-                self.design.surf, self.design.rect, self.mask
+            window.window.blit(
+                self.design.surf, self.design.rect.move(offset), self.mask
             )
-            self.design.x, self.design.y = new_rect.x, new_rect.y
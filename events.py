@@ -7,11 +7,27 @@ from typing import TYPE_CHECKING, Any, Callable, Optional
 
 import pygame
 
+import input_state
 import utils
 
 if TYPE_CHECKING:
+    import element
     import scene
 
+
+def binding_keys(options: dict[str, Any]) -> set[tuple[int, int]]:
+    """Every (key, normalised modifiers) a key listener's options match. "key" and
+    "mods" may each be one value or a list of alternatives, and "mods" defaults to
+    none"""
+    keys: int | list[int] = options["key"]
+    mods: int | list[int] = options.get("mods", pygame.KMOD_NONE)
+    return {
+        (key, input_state.normalise_mods(mod))
+        for key in (keys if isinstance(keys, list) else [keys])
+        for mod in (mods if isinstance(mods, list) else [mods])
+    }
+
+
 # The way events will be handled is heavily influenced by JavaScript, especially
 # addEventListener and removeEventListener. The interface for it should share its state
 # across all instantiations, and so it is a Singleton. This file should implement the
@@ -24,15 +40,7 @@ class Events(metaclass=utils.Singleton):
     def __init__(self) -> None:
         if not hasattr(self, "created"):
             self.created: bool = True
-            self.__pressed_keys: dict[str, list[int]] = {
-                "keys": [],
-                "mods": [],
-                "unicode": [],
-                "scancode": [],
-            }
-            self.__repeat: bool = False
-            self.__repeat_initial_delay: int = 0
-            self.__repeat_interval: int = 0
+            self.input: input_state.InputState = input_state.InputState()
             self.__cur_scene: Optional["scene.Scene"] = None
             self.__processors: dict[
                 int,
@@ -126,10 +134,15 @@ class Events(metaclass=utils.Singleton):
             self.__reversed_pygame_evts = types.MappingProxyType(
                 copy.deepcopy(self.reversed_event_types)
             )
-            self.event_types["key_press"] = pygame.event.custom_type()
             self.event_types["stat_edit"] = pygame.event.custom_type()
             self.event_types["switch_scene"] = pygame.event.custom_type()
             self.event_types["death_event"] = pygame.event.custom_type()
+            self.event_types["sim_tick"] = pygame.event.custom_type()
+            # Sent straight to the element the pointer moves onto or off of, rather
+            # than through the queue
+            self.event_types["mouse_enter"] = pygame.event.custom_type()
+            self.event_types["mouse_leave"] = pygame.event.custom_type()
+            self.__hovered: Optional["element.ListenerHolder"] = None
 
             def __process_key_up_or_down(
                 event: pygame.event.Event,
@@ -186,36 +199,11 @@ class Events(metaclass=utils.Singleton):
                         return True
                 return False
 
-            def __process_key_press(
-                event: pygame.event.Event,
-                func: Callable[
-                    [pygame.event.Event, dict[str, Any]],
-                    Optional[functools.partial[None]],
-                ],
-                options: Optional[dict[str, Any]],
-            ) -> bool:
-                if options is not None:
-                    keys_in: bool = False
-                    mods_in: bool = False
-                    for key in options["key"]:
-                        keys_in = key in event.key
-                        if keys_in:
-                            break
-                    mods_in = (options["mods"] == [pygame.KMOD_NONE]) and (event.mod == [pygame.KMOD_NONE])
-                    if not mods_in:
-                        for mod in options["mods"]:
-                            mods_in = mods_in if mods_in else mod & event.mod[0]
-                    if keys_in and mods_in:
-                        func(event, options)
-                        return True
-                return False
-
             self.register_processor("quit", __process_exit)
             self.register_processor("key_down", __process_key_up_or_down)
             self.register_processor("key_up", __process_key_up_or_down)
             self.register_processor("mouse_button_down", __process_mouse_button_down)
             self.register_processor("stat_edit", __process_dmg)
-            self.register_processor("key_press", __process_key_press)
             self.__timers: set[int] = set([])
 
     @property
@@ -282,49 +270,7 @@ class Events(metaclass=utils.Singleton):
     @cur_scene.setter
     def cur_scene(self, new_scene: "scene.Scene") -> None:
         self.__cur_scene = new_scene
-
-    def start_repeat(self) -> None:
-        if self.__repeat_initial_delay == self.__repeat_interval == 0:
-            raise ValueError(
-                "A delay and/or repeat must be specified to repeat keypresses"
-            )
-        self.__repeat = True
-
-    def set_key_repeat(self, initial_delay: int = 0, interval: int = 0) -> None:
-        if initial_delay == interval == 0:
-            return
-        if initial_delay == 0:
-            initial_delay = interval
-        elif interval == 0:
-            interval = initial_delay
-        self.__repeat_initial_delay = initial_delay
-        self.__repeat_interval = interval
-        self.start_repeat()
-
-    def create_key_press_event(self, full_delta: int) -> int:
-        if (
-            len(self.__pressed_keys["keys"])
-            == len(self.__pressed_keys["mods"])
-            == len(self.__pressed_keys["unicode"])
-            == len(self.__pressed_keys["scancode"])
-            == 0
-        ):
-            return 0
-        evt: pygame.event.Event = pygame.event.Event(
-            self.event_types["key_press"],
-            key=self.__pressed_keys["keys"],
-            mod=self.__pressed_keys["mods"],
-            unicode=self.__pressed_keys["unicode"],
-            scancode=self.__pressed_keys["scancode"],
-        )
-        if self.__repeat:
-            loops: int = full_delta // self.__repeat_interval
-            pygame.time.set_timer(evt, self.__repeat_interval, loops=loops)
-            return full_delta % self.__repeat_interval
-        if full_delta >= self.__repeat_initial_delay:
-            pygame.time.set_timer(evt, self.__repeat_initial_delay, loops=1)
-            return int(full_delta - self.__repeat_initial_delay)
-        return full_delta
+        self.__hovered = None
 
     def quit(self) -> None:
         pygame.quit()
@@ -473,28 +419,28 @@ class Events(metaclass=utils.Singleton):
         if event.type == pygame.QUIT:
             self.quit()
         elif event.type == pygame.KEYDOWN:
-            self.__pressed_keys["keys"].append(event.key)
-            self.__pressed_keys["mods"] = [event.mod]
-            self.__pressed_keys["unicode"].append(event.unicode)
-            self.__pressed_keys["scancode"].append(event.scancode)
+            self.input.key_down(event)
         elif event.type == pygame.KEYUP:
-            if event.key in self.__pressed_keys["keys"]:
-                self.__pressed_keys["keys"].remove(event.key)
-            if event.mod in self.__pressed_keys["mods"]:
-                self.__pressed_keys["mods"] = [pygame.KMOD_NONE]
-            if event.unicode in self.__pressed_keys["unicode"]:
-                self.__pressed_keys["unicode"].remove(event.unicode)
-            if event.scancode in self.__pressed_keys["scancode"]:
-                self.__pressed_keys["scancode"].remove(event.scancode)
-            if (
-                len(self.__pressed_keys["keys"])
-                == len(self.__pressed_keys["unicode"])
-                == len(self.__pressed_keys["scancode"])
-                == 0
-            ) and self.__pressed_keys["mods"] == [pygame.KMOD_NONE]:
-                self.__repeat = False
+            self.input.key_up(event)
+        elif event.type == pygame.WINDOWFOCUSLOST:
+            self.input.release_all()
         if listeners is None:
             return
+        if (
+            event.type
+            in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION)
+            and self.cur_scene is not None
+            and listeners is self.cur_scene.all_listeners
+        ):
+            self.notify_pointer(event, self.cur_scene)
+            return
+        if (
+            event.type in (pygame.KEYDOWN, pygame.KEYUP)
+            and self.cur_scene is not None
+            and listeners is self.cur_scene.all_listeners
+        ):
+            self.notify_keys(event, self.cur_scene)
+            return
         if event.type not in listeners:
             # print(pygame.event.event_name(event.type))
             # print(event.type)  # , self.event_types)
@@ -509,6 +455,87 @@ class Events(metaclass=utils.Singleton):
                 if result and options is not None:
                     if "once" in options:
                         if options["once"]:
-                            options["target"].deregister_listener(
-                                event.type, func, options
-                            )
+                            options["target"].deregister_listener(event.type, func)
+
+    def fire(
+        self,
+        event: pygame.event.Event,
+        targeted: list[
+            tuple[
+                Callable[
+                    [pygame.event.Event, dict[str, Any]],
+                    Optional[functools.partial[None]],
+                ],
+                dict[str, Any],
+            ]
+        ],
+    ) -> None:
+        """Calls listeners that have already been matched to the event"""
+        for func, options in targeted:
+            func(event, options)
+            if options.get("once", False):
+                options["target"].deregister_listener(event.type, func)
+
+    def notify_pointer(
+        self, event: pygame.event.Event, cur_scene: "scene.Scene"
+    ) -> None:
+        """Sends a mouse event to the front-most element under the pointer that
+        listens for it, found through the scene's hit-testing index. The scene and
+        window, which are behind every element, only get it when no element does.
+        Motion also moves the hover, sending mouse_leave and mouse_enter"""
+        targets = cur_scene.targets(event.type)
+        hover_types: tuple[int, int] = (
+            self.event_types["mouse_enter"],
+            self.event_types["mouse_leave"],
+        )
+        hovering: bool = event.type == pygame.MOUSEMOTION and (
+            self.__hovered is not None
+            or any(len(cur_scene.targets(t)) > 0 for t in hover_types)
+        )
+        if len(targets) == 0 and not hovering:
+            return
+        hits: list["element.Element"] = cur_scene.hit_test(event.pos)
+        hit: Optional["element.ListenerHolder"] = next(
+            (e for e in hits if e in targets), None
+        )
+        if hit is not None:
+            self.fire(event, targets[hit])
+        else:
+            self.fire(
+                event,
+                [
+                    listener
+                    for target, targeted in targets.items()
+                    if not cur_scene.has_element(target)
+                    for listener in targeted
+                ],
+            )
+        if not hovering:
+            return
+        hovered: Optional["element.ListenerHolder"] = next(
+            (e for e in hits if any(e in cur_scene.targets(t) for t in hover_types)),
+            None,
+        )
+        if hovered is self.__hovered:
+            return
+        if self.__hovered is not None:
+            self.fire(
+                pygame.event.Event(hover_types[1], pos=event.pos),
+                cur_scene.targets(hover_types[1]).get(self.__hovered, []),
+            )
+        if hovered is not None:
+            self.fire(
+                pygame.event.Event(hover_types[0], pos=event.pos),
+                cur_scene.targets(hover_types[0]).get(hovered, []),
+            )
+        self.__hovered = hovered
+
+    def notify_keys(self, event: pygame.event.Event, cur_scene: "scene.Scene") -> None:
+        """Looks a keystroke's listeners up in the scene's compiled key bindings.
+        Held keys are polled from input instead, each simulation tick"""
+        self.fire(
+            event,
+            cur_scene.bindings(event.type).get(
+                (event.key, input_state.normalise_mods(event.mod)), []
+            ),
+        )
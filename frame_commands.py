@@ -0,0 +1,66 @@
+import concurrent.futures._base as cf_b
+import concurrent.futures.process as cf_p
+from typing import Any, Callable, Optional, Sequence
+
+import pygame
+
+import draw_process_funcs as dpf
+
+
+class FrameCommands:
+    def __init__(self) -> None:
+        """Collects a frame's draw operations for the draw process, so that they can
+        be sent as one message and replayed there in order"""
+        self.commands: list[tuple[Any, ...]] = []
+        self.callbacks: list[tuple[int, Callable[[Any], None]]] = []
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def __add(
+        self, command: tuple[Any, ...], callback: Optional[Callable[[Any], None]]
+    ) -> None:
+        if callback is not None:
+            self.callbacks.append((len(self.commands), callback))
+        self.commands.append(command)
+
+    def fill(
+        self,
+        colour: Sequence[int] | tuple[int, int, int],
+        callback: Optional[Callable[[pygame.Rect], None]] = None,
+    ) -> None:
+        self.__add(("fill", colour), callback)
+
+    def blit(
+        self,
+        handle: int,
+        rect: pygame.Rect,
+        mask: Optional[pygame.Rect] = None,
+        callback: Optional[Callable[[Optional[pygame.Rect]], None]] = None,
+    ) -> None:
+        self.__add(("blit", handle, rect, mask), callback)
+
+    def upload(self, handle: int, source: tuple[str, Sequence[int]]) -> None:
+        self.__add(("upload", handle, source), None)
+
+    def free(self, handle: int) -> None:
+        self.__add(("free", handle), None)
+
+    def release(self, name: str) -> None:
+        self.__add(("release", name), None)
+
+    def flip(self) -> None:
+        self.__add(("flip",), None)
+
+    def get_events(
+        self, callback: Callable[[list[tuple[int, dict[str, Any]]]], None]
+    ) -> None:
+        self.__add(("events",), callback)
+
+    def submit(self, executor: cf_p.ProcessPoolExecutor) -> cf_b.Future:
+        return executor.submit(dpf.run_frame, self.commands)
+
+    def dispatch(self, future: cf_b.Future) -> None:
+        results: list[Any] = future.result()
+        for i, callback in self.callbacks:
+            callback(results[i])
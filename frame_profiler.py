@@ -0,0 +1,110 @@
+import atexit
+import collections
+import contextlib
+import csv
+import json
+import math
+import pathlib
+import time
+from typing import Any, ContextManager, Iterator, Optional
+
+
+class FrameProfiler:
+    def __init__(
+        self,
+        enabled: bool = False,
+        window: int = 600,
+        dump_path: Optional[pathlib.Path | str] = None,
+    ) -> None:
+        """Rolling per-phase timings and counters for the frame loop, written to
+        dump_path at exit if it is set"""
+        self.enabled = enabled
+        self.window = window
+        self.timings: dict[str, collections.deque[float]] = {}
+        self.counts: dict[str, collections.deque[int]] = {}
+        self.__disabled: ContextManager[None] = contextlib.nullcontext()
+        self.__pending: dict[str, float] = {}
+        if dump_path is not None:
+            atexit.register(self.dump, dump_path)
+
+    def phase(self, name: str, accumulate: bool = False) -> ContextManager[None]:
+        """Time the body of a with statement. Accumulated phases are added up over
+        the frame and recorded as one sample by end_frame()"""
+        if not self.enabled:
+            return self.__disabled
+        return self.__time_phase(name, accumulate)
+
+    @contextlib.contextmanager
+    def __time_phase(self, name: str, accumulate: bool) -> Iterator[None]:
+        start: int = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            milliseconds: float = (time.perf_counter_ns() - start) / 1_000_000
+            if accumulate:
+                self.__pending[name] = self.__pending.get(name, 0.0) + milliseconds
+            else:
+                self.record(name, milliseconds)
+
+    def end_frame(self) -> None:
+        for name, milliseconds in self.__pending.items():
+            self.record(name, milliseconds)
+        self.__pending = {}
+
+    def record(self, name: str, milliseconds: float) -> None:
+        if name not in self.timings:
+            self.timings[name] = collections.deque(maxlen=self.window)
+        self.timings[name].append(milliseconds)
+
+    def count(self, name: str, value: int) -> None:
+        if not self.enabled:
+            return
+        if name not in self.counts:
+            self.counts[name] = collections.deque(maxlen=self.window)
+        self.counts[name].append(value)
+
+    def reset(self) -> None:
+        self.timings = {}
+        self.counts = {}
+        self.__pending = {}
+
+    @staticmethod
+    def summarise(
+        samples: collections.deque[float] | collections.deque[int],
+    ) -> dict[str, float]:
+        ordered: list[float] = sorted(samples)
+        if len(ordered) == 0:
+            return {"samples": 0, "mean": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "samples": len(ordered),
+            "mean": sum(ordered) / len(ordered),
+            "p95": ordered[math.ceil(0.95 * len(ordered)) - 1],
+            "p99": ordered[math.ceil(0.99 * len(ordered)) - 1],
+            "max": ordered[-1],
+        }
+
+    def stats(self) -> dict[str, dict[str, dict[str, float]]]:
+        return {
+            "timings_ms": {
+                name: self.summarise(samples) for name, samples in self.timings.items()
+            },
+            "counts": {
+                name: self.summarise(samples) for name, samples in self.counts.items()
+            },
+        }
+
+    def dump(self, path: pathlib.Path | str) -> None:
+        path = pathlib.Path(path)
+        stats: dict[str, dict[str, dict[str, float]]] = self.stats()
+        if path.suffix == ".csv":
+            with path.open("w", newline="", encoding="utf-8") as f:
+                writer: Any = csv.writer(f)
+                writer.writerow(
+                    ["kind", "name", "samples", "mean", "p95", "p99", "max"]
+                )
+                for kind, entries in stats.items():
+                    for name, summary in entries.items():
+                        writer.writerow([kind, name, *summary.values()])
+        else:
+            with path.open("w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=4)
@@ -0,0 +1,53 @@
+from typing import Optional
+
+import pygame
+
+import utils
+
+
+class GameClock(metaclass=utils.Singleton):
+    def __init__(
+        self,
+        tick_rate: int = 50,
+        max_fps: int = 25,
+        max_frame_time: int = 250,
+        frame_time: Optional[float] = None,
+    ) -> None:
+        """A fixed timestep simulation clock, decoupled from the render rate. A set
+        frame_time advances every frame by exactly that, for headless runs"""
+        if not hasattr(self, "created"):
+            self.created: bool = True
+            if tick_rate <= 0:
+                raise ValueError("The tick rate must be positive")
+            if max_fps < 0:
+                raise ValueError("The frame rate cap must be at least 0")
+            self.clock: pygame.time.Clock = pygame.time.Clock()
+            self.tick_rate = tick_rate
+            self.max_fps = max_fps
+            self.max_frame_time = max_frame_time
+            self.frame_time = frame_time
+            self.frame_times: list[int] = [0]
+            self.sim_time: float = 0.0
+            self.__accumulator: float = 0.0
+
+    @property
+    def step(self) -> float:
+        return 1000 / self.tick_rate
+
+    @property
+    def fps(self) -> float:
+        return self.clock.get_fps()
+
+    def tick(self) -> int:
+        frame_time: int = self.clock.tick(self.max_fps)
+        self.frame_times.append(frame_time)
+        if len(self.frame_times) > 10:
+            self.frame_times = self.frame_times[(len(self.frame_times) - 10) :]
+        if self.frame_time is not None:
+            self.__accumulator += self.frame_time
+        else:
+            self.__accumulator += min(frame_time, self.max_frame_time)
+        steps: int = int(self.__accumulator // self.step)
+        self.__accumulator -= steps * self.step
+        self.sim_time += steps * self.step
+        return steps
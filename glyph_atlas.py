@@ -0,0 +1,123 @@
+import string
+from typing import Any, Sequence
+
+import pygame
+
+DEFAULT_CHARACTERS: str = (
+    string.ascii_letters + string.digits + string.punctuation + " "
+)
+
+
+class GlyphAtlas:
+    def __init__(
+        self,
+        font: pygame.font.Font,
+        colour: Any = (0, 0, 0),
+        anti_alias: bool = True,
+        characters: str = DEFAULT_CHARACTERS,
+    ) -> None:
+        """Every glyph of a font rendered once onto one sheet, which strings are
+        blitted from"""
+        self.font = font
+        self.colour: pygame.Color = pygame.Color(colour)
+        self.anti_alias = anti_alias
+        self.height: int = font.get_height()
+        self.sheet: pygame.Surface = pygame.Surface((0, 0), pygame.SRCALPHA)
+        self.glyphs: dict[str, pygame.Rect] = {}
+        self.__kerning: dict[tuple[str, str], int] = {}
+        self.add(characters)
+
+    def __contains__(self, character: str) -> bool:
+        return character in self.glyphs
+
+    def add(self, characters: str) -> None:
+        """Renders any glyphs not on the sheet yet, and rebuilds the sheet with them"""
+        new: list[str] = sorted(set(characters) - self.glyphs.keys())
+        if len(new) == 0:
+            return
+        rendered: list[tuple[pygame.Surface, pygame.Rect]] = [
+            (self.sheet, self.sheet.get_rect())
+        ]
+        x: int = self.sheet.get_width()
+        for character in new:
+            glyph: pygame.Surface = self.font.render(
+                character, self.anti_alias, self.colour
+            )
+            self.glyphs[character] = pygame.Rect(x, 0, *glyph.get_size())
+            rendered.append((glyph, self.glyphs[character]))
+            x += glyph.get_width()
+        sheet: pygame.Surface = pygame.Surface(
+            (x, max(self.height, *(rect.height for _, rect in rendered))),
+            pygame.SRCALPHA,
+        )
+        sheet.blits(rendered, doreturn=False)
+        self.sheet = sheet
+
+    def kerning(self, left: str, right: str) -> int:
+        """How much closer than their widths two glyphs sit. Asked of the font once
+        per pair, then remembered"""
+        pair: tuple[str, str] = (left, right)
+        if pair not in self.__kerning:
+            self.__kerning[pair] = (
+                self.font.size(left + right)[0]
+                - self.glyphs[left].width
+                - self.glyphs[right].width
+            )
+        return self.__kerning[pair]
+
+    def layout(self, text: str) -> list[tuple[pygame.Rect, int]]:
+        """Each glyph's rect on the sheet, and the x it goes at"""
+        self.add(text)
+        placed: list[tuple[pygame.Rect, int]] = []
+        x: int = 0
+        previous: str = ""
+        for character in text:
+            if previous != "":
+                x += self.kerning(previous, character)
+            placed.append((self.glyphs[character], x))
+            x += self.glyphs[character].width
+            previous = character
+        return placed
+
+    def size(self, text: str) -> tuple[int, int]:
+        placed: list[tuple[pygame.Rect, int]] = self.layout(text)
+        if len(placed) == 0:
+            return (0, self.height)
+        return (placed[-1][1] + placed[-1][0].width, self.height)
+
+    def render_to(
+        self, surf: pygame.Surface, text: str, pos: Sequence[int] = (0, 0)
+    ) -> pygame.Rect:
+        """Draws text onto surf, allocating nothing, and returns the area drawn to"""
+        placed: list[tuple[pygame.Rect, int]] = self.layout(text)
+        surf.blits(
+            [(self.sheet, (pos[0] + x, pos[1]), area) for area, x in placed],
+            doreturn=False,
+        )
+        width: int = 0 if len(placed) == 0 else placed[-1][1] + placed[-1][0].width
+        return pygame.Rect(pos[0], pos[1], width, self.height)
+
+    def render(self, text: str) -> pygame.Surface:
+        surf: pygame.Surface = pygame.Surface(self.size(text), pygame.SRCALPHA)
+        # Transparent pixels of the text's own colour, so anti-aliased edges blend
+        # towards it rather than towards black
+        surf.fill((self.colour.r, self.colour.g, self.colour.b, 0))
+        self.render_to(surf, text)
+        return surf
+
+
+# Shared atlases, so every label in one font and colour uses the same sheet
+atlases: dict[tuple[pygame.font.Font, tuple[int, ...], bool], GlyphAtlas] = {}
+
+
+def get(
+    font: pygame.font.Font, colour: Any = (0, 0, 0), anti_alias: bool = True
+) -> GlyphAtlas:
+    key: tuple[pygame.font.Font, tuple[int, ...], bool] = (
+        font,
+        tuple(pygame.Color(colour)),
+        anti_alias,
+    )
+    if key not in atlases:
+        atlases[key] = GlyphAtlas(font, colour, anti_alias)
+    return atlases[key]
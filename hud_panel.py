@@ -0,0 +1,167 @@
+from typing import Any, Callable, Optional, Sequence
+
+import pygame
+
+import element
+import glyph_atlas
+import sprite
+
+# Where a part gets a value from: the name of an attribute of the panel's source,
+# a function of the source, or a constant
+Binding = str | Callable[[Any], Any] | float
+
+
+def resolve(binding: Binding, source: Any) -> Any:
+    if isinstance(binding, str):
+        return getattr(source, binding)
+    if callable(binding):
+        return binding(source)
+    return binding
+
+
+class Bar:
+    def __init__(
+        self,
+        area: pygame.Rect,
+        colour: Any,
+        value: Binding,
+        maximum: Binding,
+    ) -> None:
+        """A bar filled from the left in proportion to value / maximum"""
+        self.area = area
+        self.colour = colour
+        self.value = value
+        self.maximum = maximum
+        self.width: int = -1
+
+    def update(self, source: Any) -> list[pygame.Rect]:
+        maximum: float = resolve(self.maximum, source)
+        fraction: float = 0.0 if maximum == 0 else resolve(self.value, source) / maximum
+        width: int = int(self.area.width * max(0.0, min(fraction, 1.0)))
+        if width == self.width:
+            return []
+        old_width: int = max(self.width, 0)
+        self.width = width
+        if old_width == width:
+            return [self.area.copy()]
+        # Only the strip between the old and new ends changes
+        return [
+            pygame.Rect(
+                self.area.x + min(old_width, width),
+                self.area.y,
+                abs(width - old_width),
+                self.area.height,
+            )
+        ]
+
+    def draw(self, surf: pygame.Surface) -> None:
+        surf.fill(
+            self.colour,
+            pygame.Rect(self.area.x, self.area.y, self.width, self.area.height),
+        )
+
+
+class Label:
+    def __init__(
+        self,
+        pos: Sequence[int],
+        glyphs: glyph_atlas.GlyphAtlas,
+        template: str,
+        fields: dict[str, Binding],
+    ) -> None:
+        """Text made by filling template's {fields} in from the source"""
+        self.pos: tuple[int, int] = (pos[0], pos[1])
+        self.glyphs = glyphs
+        self.template = template
+        self.fields = fields
+        self.text: Optional[str] = None
+        self.area: pygame.Rect = pygame.Rect(self.pos, (0, 0))
+
+    def update(self, source: Any) -> list[pygame.Rect]:
+        text: str = self.template.format(
+            **{name: resolve(binding, source) for name, binding in self.fields.items()}
+        )
+        if text == self.text:
+            return []
+        self.text = text
+        old_area: pygame.Rect = self.area
+        self.area = pygame.Rect(self.pos, self.glyphs.size(text))
+        return [old_area, self.area]
+
+    def draw(self, surf: pygame.Surface) -> None:
+        if self.text is not None:
+            self.glyphs.render_to(surf, self.text, self.pos)
+
+
+class HudPanel(element.Element):
+    def __init__(
+        self,
+        source: Any,
+        rect: pygame.Rect,
+        colour: Any,
+        visible: bool = True,
+    ) -> None:
+        """Bars and labels bound to source's values, drawn onto one kept surface that
+        only has its changed parts redrawn"""
+        self.source = source
+        self.colour = colour
+        self.parts: list[Bar | Label] = []
+        surf: pygame.Surface = pygame.Surface(rect.size)
+        surf.fill(colour)
+        design: sprite.Sprite = sprite.Sprite(surf, rect.copy())
+        design.owned = True
+        super().__init__(design, visible=visible)
+
+    def add_bar(
+        self,
+        area: pygame.Rect,
+        colour: Any,
+        value: Binding,
+        maximum: Binding,
+    ) -> Bar:
+        new_bar: Bar = Bar(area, colour, value, maximum)
+        self.parts.append(new_bar)
+        self.refresh()
+        return new_bar
+
+    def add_label(
+        self,
+        pos: Sequence[int],
+        glyphs: glyph_atlas.GlyphAtlas,
+        template: str,
+        **fields: Binding,
+    ) -> Label:
+        label: Label = Label(pos, glyphs, template, fields)
+        self.parts.append(label)
+        self.refresh()
+        return label
+
+    def bind(self, holder: element.ListenerHolder, event_type: int | str) -> None:
+        """Refreshes the panel whenever holder gets event_type, like an entity's
+        stat_edit"""
+        holder.register_listener(event_type, self.__changed)
+
+    def __changed(
+        self,
+        event: pygame.event.Event,  # pylint: disable=unused-argument
+        options: dict[str, Any],  # pylint: disable=unused-argument
+    ) -> None:
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Redraws the areas of parts whose values changed, along with anything
+        overlapping them, in the order the parts were added"""
+        changed: list[pygame.Rect] = []
+        for part in self.parts:
+            changed.extend(part.update(self.source))
+        changed = [area for area in changed if area.width > 0 and area.height > 0]
+        if len(changed) == 0:
+            return
+        surf: pygame.Surface = self.design.writable()
+        for area in changed:
+            surf.set_clip(area)
+            surf.fill(self.colour)
+            for part in self.parts:
+                if part.area.colliderect(area):
+                    part.draw(surf)
+        surf.set_clip(None)
@@ -0,0 +1,73 @@
+import pygame
+
+# SDL's scancodes all fit below this
+SCANCODES: int = 512
+# The modifiers bindings tell apart. Either side's key counts as the modifier, and
+# lock keys like caps and num lock are ignored
+SIDED_MODS: tuple[int, ...] = (
+    pygame.KMOD_SHIFT,
+    pygame.KMOD_CTRL,
+    pygame.KMOD_ALT,
+    pygame.KMOD_META,
+)
+
+
+def normalise_mods(mods: int) -> int:
+    normalised: int = pygame.KMOD_NONE
+    for sided in SIDED_MODS:
+        if mods & sided:
+            normalised |= sided
+    return normalised
+
+
+class InputState:
+    def __init__(self) -> None:
+        """What the keyboard is doing, kept up to date from key events and polled by
+        game code each simulation tick, instead of game code being sent a stream of
+        repeated key events. Keys pressed or released since the last tick are kept
+        until a tick has seen them, so a tap shorter than a tick isn't lost"""
+        self.scancodes: bytearray = bytearray(SCANCODES)
+        self.held: set[int] = set()
+        self.pressed: set[int] = set()
+        self.released: set[int] = set()
+        self.mods: int = pygame.KMOD_NONE
+
+    def key_down(self, event: pygame.event.Event) -> None:
+        if event.key not in self.held:
+            self.pressed.add(event.key)
+        self.held.add(event.key)
+        if 0 <= event.scancode < SCANCODES:
+            self.scancodes[event.scancode] = 1
+        self.mods = normalise_mods(event.mod)
+
+    def key_up(self, event: pygame.event.Event) -> None:
+        if event.key in self.held:
+            self.held.discard(event.key)
+            self.released.add(event.key)
+        if 0 <= event.scancode < SCANCODES:
+            self.scancodes[event.scancode] = 0
+        self.mods = normalise_mods(event.mod)
+
+    def release_all(self) -> None:
+        """Lets go of every key, for when the window loses focus and won't be told
+        about keys being released"""
+        self.released.update(self.held)
+        self.held.clear()
+        self.scancodes = bytearray(SCANCODES)
+        self.mods = pygame.KMOD_NONE
+
+    def is_held(self, key: int) -> bool:
+        return key in self.held
+
+    def is_scancode_held(self, scancode: int) -> bool:
+        return 0 <= scancode < SCANCODES and self.scancodes[scancode] == 1
+
+    def axis(self, negative: int, positive: int) -> int:
+        """-1, 0 or 1, from which of two opposing keys is held. Both, or neither,
+        is 0"""
+        return int(positive in self.held) - int(negative in self.held)
+
+    def end_tick(self) -> None:
+        """Forgets which keys were pressed and released, once a tick has seen them"""
+        self.pressed.clear()
+        self.released.clear()
@@ -0,0 +1,61 @@
+import concurrent.futures as cf
+import pathlib
+from typing import Iterable, Optional
+
+import pygame
+
+import utils
+
+
+class Preloader:
+    def __init__(self, max_workers: int = 2) -> None:
+        """Decodes images on a pool of threads ahead of get_asset() needing them"""
+        self.executor: cf.ThreadPoolExecutor = cf.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="preload"
+        )
+        self.futures: dict[str, cf.Future[tuple[pygame.Surface, bool]]] = {}
+
+    def preload(
+        self, asset_locations: Iterable[str | pathlib.Path]
+    ) -> list[cf.Future[tuple[pygame.Surface, bool]]]:
+        """Starts decoding each image that isn't already cached, in an atlas or on
+        its way, and returns the futures of those still loading"""
+        queued: list[cf.Future[tuple[pygame.Surface, bool]]] = []
+        for asset_location in asset_locations:
+            absolute_path: pathlib.Path = utils.asset_path(asset_location)
+            posix_path: str = absolute_path.as_posix()
+            future: cf.Future[tuple[pygame.Surface, bool]]
+            if posix_path in utils.loading:
+                future = utils.loading[posix_path]
+            elif posix_path in utils.assets or any(
+                posix_path in loaded_atlas.regions for loaded_atlas in utils.atlases
+            ):
+                continue
+            else:
+                future = self.executor.submit(utils.decode_asset, absolute_path)
+                utils.loading[posix_path] = future
+            self.futures[posix_path] = future
+            queued.append(future)
+        return queued
+
+    @property
+    def progress(self) -> float:
+        """The fraction of preloaded images that have been decoded, for a loading
+        screen"""
+        if len(self.futures) == 0:
+            return 1.0
+        return sum(f.done() for f in self.futures.values()) / len(self.futures)
+
+    @property
+    def done(self) -> bool:
+        return all(f.done() for f in self.futures.values())
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything has been decoded, then caches it all. Returns
+        whether that happened before the timeout"""
+        _, not_done = cf.wait(self.futures.values(), timeout=timeout)
+        utils.finish_loading()
+        return len(not_done) == 0
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
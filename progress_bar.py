@@ -36,3 +36,4 @@ class ProgressBar(element.Element):
     def update(self, new_value: int) -> None:
         if self.mask is not None:
             self.mask.width = int(self.max_width * (new_value / self.max_value))
+            self.design.touch()
@@ -1,16 +1,25 @@
 import functools
-from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
+import itertools
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, Sequence
 
 import pygame
 
+import camera
 import element
+import events
+import frame_commands
+import spatial_index
 import sprite
+import surface_registry
 
 if TYPE_CHECKING:
     import display
 
+# Numbers each static composite, so its registry key is never reused
+composites: Iterator[int] = itertools.count()
 
-class Scene(element.Element):
+
+class Scene(element.Element):  # pylint: disable=too-many-public-methods
     def __init__(self, bground: sprite.Sprite) -> None:
         super().__init__(bground)
         self.renderables = None
@@ -27,15 +36,535 @@ class Scene(element.Element):
                 ],
             ]
         ] = None
+        self.static_layers: set[int] = set()
+        # A static run's composite, the layout_version and camera position it was
+        # made at, and its number
+        self.__static_cache: dict[
+            int, tuple[pygame.Surface, int, tuple[int, int], int]
+        ] = {}
+        # Static layers with an element that changed since they were composited
+        self.__stale_layers: set[int] = set()
+        # The registry handle each static run's composite was uploaded as, under
+        # AsyncDisplay, and the composite's number
+        self.__static_handles: dict[int, tuple[int, int]] = {}
+        self.camera: Optional[camera.Camera] = None
+        self.screen_layers: set[int] = set()
+        self.index: spatial_index.SpatialGrid[element.Element] = (
+            spatial_index.SpatialGrid()
+        )
+        # Screen layers are indexed apart from the world, as their elements are
+        # placed on the screen rather than in the world
+        self.screen_index: spatial_index.SpatialGrid[element.Element] = (
+            spatial_index.SpatialGrid()
+        )
+        # Bumped whenever an element is added to, removed from or replaced in a
+        # layer, or a layer is swapped for another
+        self.layout_version: int = 0
+        self.__layout: list[tuple[list[element.Element], list[element.Element]]] = []
+        self.__index_version: int = -1
+        self.__order: dict[element.Element, tuple[int, int]] = {}
+        self.__moved: set[element.Element] = set()
+        self.__culled: list[list[element.Element]] = []
+        self.__shown: set[element.Element] = set()
+        # What the last cull() was worked out for, so it can be reused until
+        # something moves or the viewport or layers change
+        self.__cull_key: Optional[tuple[tuple[int, ...], tuple[int, ...], int]] = None
+        # Elements that moved, changed, or came into or went out of view since the
+        # last take_changed()
+        self.__changed: set[element.Element] = set()
+        # Set by Display.provide_scene(), for scenes that can be pooled and reused
+        self.kind: Optional[str] = None
+        self.data: tuple[Any, ...] = ()
+        self.binder: Optional[Callable[..., None]] = None
+        self.active: bool = False
+        # Bumped whenever the listener table changes
+        self.listener_version: int = 0
+        self.__listener_holders: list[element.ListenerHolder] = []
+        self.__listener_layout_version: int = -1
+        self.__listener_window: Optional["display.Display"] = None
+        self.__targets: dict[
+            int,
+            dict[
+                element.ListenerHolder,
+                list[
+                    tuple[
+                        Callable[
+                            [pygame.event.Event, dict[str, Any]],
+                            Optional[functools.partial[None]],
+                        ],
+                        dict[str, Any],
+                    ]
+                ],
+            ],
+        ] = {}
+        self.__bindings: dict[
+            int,
+            dict[
+                tuple[int, int],
+                list[
+                    tuple[
+                        Callable[
+                            [pygame.event.Event, dict[str, Any]],
+                            Optional[functools.partial[None]],
+                        ],
+                        dict[str, Any],
+                    ]
+                ],
+            ],
+        ] = {}
+        # The listener_version targets and bindings were worked out for
+        self.__grouped_version: int = -1
+
+    def activate(self) -> None:
+        """Called by the Display when the scene becomes the current one"""
+        self.active = True
+
+    def deactivate(self) -> None:
+        """Stops watching the scene's elements while another scene is shown"""
+        self.active = False
+        self.__clear_index()
+        self.__index_version = -1
+        self.__unwatch_listeners()
+        self.all_listeners = None
+        self.__shown = set()
+        self.__changed = set()
+        self.__cull_key = None
+        self.invalidate_static()
+
+    def rebind(self, *data: Any) -> None:
+        """Points the scene at new data, like another enemy, without rebuilding it"""
+        if self.binder is None:
+            raise TypeError("This scene has no binder, so it can't be rebound")
+        self.binder(self, *data)  # pylint: disable=not-callable
+        self.data = data
+        self.invalidate_static()
+
+    def dispose(self) -> None:
+        """Lets go of the scene's elements and listeners once it won't be shown again"""
+        self.__clear_index()
+        self.__unwatch_listeners()
+        self.__listener_window = None
+        self.__layout = []
+        self.__shown = set()
+        self.__changed = set()
+        self.__cull_key = None
+        self.layout_version += 1
+        self.__culled = []
+        self.elements = [[]]
+        self.listeners = {}
+        self.all_listeners = None
+        self.static_layers = set()
+        self.invalidate_static()
+        for handle, _ in self.__static_handles.values():
+            surface_registry.SurfaceRegistry().release(handle)
+        self.__static_handles = {}
+        self.binder = None
+
+    def set_layer_screen(self, layer: int, screen: bool = True) -> None:
+        """Pins a layer to the screen, so it ignores the camera, as a HUD would"""
+        if screen:
+            self.screen_layers.add(layer)
+        else:
+            self.screen_layers.discard(layer)
+        self.layout_version += 1
+        self.invalidate_static()
+
+    def offset(self, layer: int) -> tuple[int, int]:
+        if self.camera is None or layer in self.screen_layers:
+            return (0, 0)
+        return self.camera.offset
+
+    def viewport(self, dimensions: Sequence[int]) -> pygame.Rect:
+        if self.camera is None:
+            return pygame.Rect(0, 0, dimensions[0], dimensions[1])
+        return self.camera.rect
+
+    def __element_moved(self, e: element.Element) -> None:
+        self.__moved.add(e)
+        self.__changed.add(e)
+        self.__cull_key = None
+        if e in self.__order and self.__order[e][0] in self.static_layers:
+            self.__stale_layers.add(self.__order[e][0])
+
+    def __clear_index(self) -> None:
+        for grid in (self.index, self.screen_index):
+            for e in grid:
+                e.unwatch(self.__element_moved)
+            grid.clear()
+        self.__order = {}
+        self.__moved = set()
+
+    def rebuild_index(self) -> None:
+        self.__clear_index()
+        for i, element_layer in enumerate(self.elements):
+            grid: spatial_index.SpatialGrid[element.Element] = (
+                self.screen_index if i in self.screen_layers else self.index
+            )
+            for j, e in enumerate(element_layer):
+                self.__order[e] = (i, j)
+                grid.insert(e, e.screen_rect)
+                e.watch(self.__element_moved)
+        self.__index_version = self.__sync_layout()
+
+    def __sync_layout(self) -> int:
+        """Bumps layout_version if a layer gained, lost or swapped an element"""
+        if len(self.__layout) != len(self.elements) or any(
+            cached_layer is not element_layer or cached != element_layer
+            for (cached_layer, cached), element_layer in zip(
+                self.__layout, self.elements
+            )
+        ):
+            # The layers themselves are kept, so a replaced layer can't be mistaken
+            # for the old one by a reused id
+            self.__layout = [
+                (element_layer, list(element_layer)) for element_layer in self.elements
+            ]
+            self.layout_version += 1
+        return self.layout_version
+
+    def sync_index(self) -> None:
+        """Brings the spatial index up to date. Moves are applied incrementally, but
+        adding, removing or replacing elements, which is rare, rebuilds it"""
+        if self.__sync_layout() != self.__index_version:
+            self.rebuild_index()
+            return
+        for e in self.__moved:
+            if e in self.index:
+                self.index.move(e, e.screen_rect)
+            elif e in self.screen_index:
+                self.screen_index.move(e, e.screen_rect)
+        self.__moved = set()
+
+    def has_element(self, e: element.ListenerHolder) -> bool:
+        """Whether e is in one of the scene's layers, as of the last sync_index()"""
+        return e in self.__order
+
+    def __query_screen(self, area: pygame.Rect) -> list[element.Element]:
+        """The elements overlapping an area of the screen, in draw order"""
+        self.sync_index()
+        hits: set[element.Element] = self.screen_index.query(area)
+        if self.camera is not None:
+            area = area.move(self.camera.to_world((0, 0)))
+        hits.update(self.index.query(area))
+        return sorted(hits, key=self.__order.__getitem__)
+
+    def hit_test(self, pos: Sequence[int]) -> list[element.Element]:
+        """The elements under a point on the screen, front-most first"""
+        return self.__query_screen(pygame.Rect(pos[0], pos[1], 1, 1))[::-1]
+
+    def overlapping(self, area: pygame.Rect) -> list[list[element.Element]]:
+        """The culled elements of each layer that overlap an area of the screen, in
+        draw order, as cull() gives them"""
+        found: list[list[element.Element]] = [[] for _ in self.elements]
+        for e in self.__query_screen(area):
+            if e in self.__shown:
+                found[self.__order[e][0]].append(e)
+        return found
+
+    def targets(self, event_type: int) -> dict[
+        element.ListenerHolder,
+        list[
+            tuple[
+                Callable[
+                    [pygame.event.Event, dict[str, Any]],
+                    Optional[functools.partial[None]],
+                ],
+                dict[str, Any],
+            ]
+        ],
+    ]:
+        """The listeners for event_type, grouped by what they are registered on.
+        Grouped again only after the listener table changes"""
+        self.__check_grouped()
+        if event_type not in self.__targets:
+            grouped: dict[
+                element.ListenerHolder,
+                list[
+                    tuple[
+                        Callable[
+                            [pygame.event.Event, dict[str, Any]],
+                            Optional[functools.partial[None]],
+                        ],
+                        dict[str, Any],
+                    ]
+                ],
+            ] = {}
+            if self.all_listeners is not None:
+                for func, options_list in self.all_listeners.get(
+                    event_type, {}
+                ).items():
+                    for options in options_list:
+                        grouped.setdefault(options["target"], []).append(
+                            (func, options)
+                        )
+            self.__targets[event_type] = grouped
+        return self.__targets[event_type]
+
+    def __check_grouped(self) -> None:
+        if self.__grouped_version != self.listener_version:
+            self.__targets = {}
+            self.__bindings = {}
+            self.__grouped_version = self.listener_version
+
+    def bindings(self, event_type: int) -> dict[
+        tuple[int, int],
+        list[
+            tuple[
+                Callable[
+                    [pygame.event.Event, dict[str, Any]],
+                    Optional[functools.partial[None]],
+                ],
+                dict[str, Any],
+            ]
+        ],
+    ]:
+        """The key listeners for event_type, by key and normalised modifiers, so a
+        keystroke looks its listeners up. Compiled again only after the listener
+        table changes"""
+        self.__check_grouped()
+        if event_type not in self.__bindings:
+            compiled: dict[
+                tuple[int, int],
+                list[
+                    tuple[
+                        Callable[
+                            [pygame.event.Event, dict[str, Any]],
+                            Optional[functools.partial[None]],
+                        ],
+                        dict[str, Any],
+                    ]
+                ],
+            ] = {}
+            if self.all_listeners is not None:
+                for func, options_list in self.all_listeners.get(
+                    event_type, {}
+                ).items():
+                    for options in options_list:
+                        for binding in events.binding_keys(options):
+                            compiled.setdefault(binding, []).append((func, options))
+            self.__bindings[event_type] = compiled
+        return self.__bindings[event_type]
+
+    def cull(self, dimensions: Sequence[int]) -> list[list[element.Element]]:
+        """The elements of each layer that overlap the viewport, in draw order.
+        Reused until something moves or the viewport or layers change"""
+        if self.camera is not None:
+            self.camera.update()
+        self.sync_index()
+        viewport: pygame.Rect = self.viewport(dimensions)
+        key: tuple[tuple[int, ...], tuple[int, ...], int] = (
+            tuple(viewport),
+            tuple(dimensions),
+            self.layout_version,
+        )
+        if key == self.__cull_key:
+            return self.__culled
+        culled: list[list[element.Element]] = [[] for _ in self.elements]
+        for e in sorted(self.index.query(viewport), key=self.__order.__getitem__):
+            culled[self.__order[e][0]].append(e)
+        for i in self.screen_layers:
+            if i < len(self.elements):
+                culled[i] = [e for e in self.elements[i] if e.is_on_screen(dimensions)]
+        shown: set[element.Element] = {e for layer in culled for e in layer}
+        for e in self.__shown - shown:
+            e.visible = False
+        for e in shown:
+            e.visible = True
+        self.__changed.update(shown.symmetric_difference(self.__shown))
+        self.__shown = shown
+        self.__culled = culled
+        self.__cull_key = key
+        return culled
+
+    def take_changed(self) -> list[tuple[element.Element, Optional[int]]]:
+        """The elements that changed or came into or out of view since the last call,
+        with the layer they are shown on, or None"""
+        changed: list[tuple[element.Element, Optional[int]]] = [
+            (e, self.__order[e][0] if e in self.__shown else None)
+            for e in self.__changed
+        ]
+        self.__changed = set()
+        return changed
+
+    def set_layer_static(self, layer: int, static: bool = True) -> None:
+        if static:
+            self.static_layers.add(layer)
+        else:
+            self.static_layers.discard(layer)
+        self.invalidate_static()
+
+    def invalidate_static(self) -> None:
+        self.__static_cache = {}
+        self.__stale_layers = set()
+
+    def static_runs(self) -> list[range]:
+        runs: list[range] = []
+        start: Optional[int] = None
+        for i in range(len(self.elements) + 1):
+            if i < len(self.elements) and i in self.static_layers:
+                if start is None:
+                    start = i
+            elif start is not None:
+                runs.append(range(start, i))
+                start = None
+        return runs
+
+    def __static_run_changed(self, run: range) -> bool:
+        """Whether a static run's composite is out of date. Its elements' watchers
+        mark its layers stale, so the elements aren't looked at"""
+        if run.start not in self.__static_cache:
+            return True
+        _, layout_version, position, _ = self.__static_cache[run.start]
+        return (
+            layout_version != self.layout_version
+            or position != self.__run_position(run)
+            or (run.start == 0 and self.design.dirty)
+            or any(i in self.__stale_layers for i in run)
+        )
+
+    def __run_position(self, run: range) -> tuple[int, int]:
+        """Where the camera was for a static run's cache, when the run scrolls"""
+        if self.camera is None or all(i in self.screen_layers for i in run):
+            return (0, 0)
+        return self.camera.rect.topleft
+
+    def refresh_static_cache(self, dimensions: Sequence[int]) -> None:
+        """Recomposites any static runs that changed. Call after cull(), as only
+        the culled elements are composited"""
+        runs: list[range] = self.static_runs()
+        starts: list[int] = [run.start for run in runs]
+        for start in list(self.__static_cache):
+            if start not in starts:
+                del self.__static_cache[start]
+        for start in list(self.__static_handles):
+            if start not in starts:
+                surface_registry.SurfaceRegistry().release(
+                    self.__static_handles.pop(start)[0]
+                )
+        for run in runs:
+            if not self.__static_run_changed(run):
+                continue
+            if run.start == 0:
+                surf: pygame.Surface = pygame.Surface(dimensions).convert()
+                surf.fill([0, 0, 0])
+                surf.blit(self.design.surf, (0, 0), self.viewport(dimensions))
+                self.mark_clean()
+            else:
+                surf = pygame.Surface(dimensions, pygame.SRCALPHA).convert_alpha()
+            for i in run:
+                for e in self.__culled[i]:
+                    surf.blit(e.design.surf, e.design.rect.move(self.offset(i)), e.mask)
+                self.__stale_layers.discard(i)
+            self.__static_cache[run.start] = (
+                surf,
+                self.layout_version,
+                self.__run_position(run),
+                next(composites),
+            )
+
+    def draw_static_async(
+        self,
+        start: int,
+        commands: frame_commands.FrameCommands,
+        dimensions: Sequence[int],
+    ) -> None:
+        """Queues a static run's composite as one blit, uploading it only when it
+        was recomposited or evicted"""
+        registry: surface_registry.SurfaceRegistry = surface_registry.SurfaceRegistry()
+        surf, _, _, number = self.__static_cache[start]
+        uploaded: Optional[tuple[int, int]] = self.__static_handles.get(start)
+        if uploaded is not None and uploaded[1] == number:
+            handle: int = uploaded[0]
+            registry.ensure_resident(handle, surf, commands)
+        else:
+            key: bytes = f"static:{number}".encode()
+            if uploaded is None:
+                handle = registry.acquire(surf, commands, key)
+            else:
+                handle = registry.replace(uploaded[0], surf, commands, key)
+            self.__static_handles[start] = (handle, number)
+        commands.blit(
+            handle,
+            pygame.Rect(0, 0, dimensions[0], dimensions[1]),
+            callback=functools.partial(self.__static_blitted, handle),
+        )
+
+    @staticmethod
+    def __static_blitted(handle: int, res: Optional[pygame.Rect]) -> None:
+        if res is None:
+            surface_registry.SurfaceRegistry().mark_evicted(handle)
+
+    @property
+    def caches_background(self) -> bool:
+        return 0 in self.static_layers and 0 in self.__static_cache
+
+    def render_groups(
+        self,
+    ) -> Iterator[tuple[int, Optional[pygame.Surface], list[element.Element]]]:
+        runs: dict[int, range] = {run.start: run for run in self.static_runs()}
+        i: int = 0
+        while i < len(self.elements):
+            if i in runs and i in self.__static_cache:
+                yield i, self.__static_cache[i][0], []
+                i = runs[i].stop
+            else:
+                yield i, None, self.__culled[i]
+                i += 1
 
     @property
     def visible_elements(self) -> Iterator[element.Element]:
-        for element_layer in self.elements:
-            for e in element_layer:
-                if e.visible:
-                    yield e
+        for element_layer in self.__culled:
+            yield from element_layer
+
+    def __listener_changed(
+        self,
+        event_type: int,
+        func: Callable[
+            [pygame.event.Event, dict[str, Any]], Optional[functools.partial[None]]
+        ],
+        options: dict[str, Any],
+        added: bool,
+    ) -> None:
+        """Applies one registration or deregistration to the listener table. The
+        event type's entry is replaced rather than changed, so a dispatch going
+        through the old one isn't disturbed by its listeners changing"""
+        if self.all_listeners is None:
+            return
+        by_func = dict(self.all_listeners.get(event_type, {}))
+        options_list: list[dict[str, Any]] = [
+            o for o in by_func.get(func, []) if o is not options
+        ]
+        if added:
+            options_list.append(options)
+        if len(options_list) > 0:
+            by_func[func] = options_list
+        else:
+            by_func.pop(func, None)
+        if len(by_func) > 0:
+            self.all_listeners[event_type] = by_func
+        else:
+            self.all_listeners.pop(event_type, None)
+        self.listener_version += 1
+
+    def __unwatch_listeners(self) -> None:
+        for holder in self.__listener_holders:
+            holder.unwatch_listeners(self.__listener_changed)
+        self.__listener_holders = []
+        self.__listener_layout_version = -1
+
+    def sync_listeners(self, window: "display.Display") -> None:
+        """Brings the listener table up to date. Registrations are applied as they
+        happen, but adding, removing or replacing elements, which is rare, rebuilds
+        it"""
+        if (
+            self.all_listeners is None
+            or window is not self.__listener_window
+            or self.__sync_layout() != self.__listener_layout_version
+        ):
+            self.get_all_listeners(window)
 
     def get_all_listeners(self, window: "display.Display") -> None:
+        self.__unwatch_listeners()
         listeners: dict[
             int,
             dict[
@@ -46,10 +575,15 @@ class Scene(element.Element):
                 list[dict[str, Any]],
             ],
         ] = {}
-        all_elements: list[list[element.Element]] = [[window, self]]
+        all_elements: list[Sequence[element.ListenerHolder]] = [[window, self]]
         all_elements.extend(self.elements)
+        seen: set[element.ListenerHolder] = set()
         for layer in all_elements:
             for e in layer:
+                # An element in more than one layer still only listens once
+                if e in seen:
+                    continue
+                seen.add(e)
                 for event_type, listeners_dict in e.listeners.items():
                     if event_type not in listeners:
                         listeners[event_type] = {}
@@ -57,4 +591,9 @@ class Scene(element.Element):
                         if callback not in listeners[event_type]:
                             listeners[event_type][callback] = []
                         listeners[event_type][callback].append(options)
+                e.watch_listeners(self.__listener_changed)
+                self.__listener_holders.append(e)
+        self.__listener_layout_version = self.__sync_layout()
+        self.__listener_window = window
         self.all_listeners = listeners
+        self.listener_version += 1
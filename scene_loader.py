@@ -0,0 +1,234 @@
+import ast
+import concurrent.futures.process as cf_p
+import json
+import operator
+import pathlib
+from typing import Any, Callable, Optional, Sequence
+
+import pygame
+
+import element
+import scene
+import sprite
+import surface_cache
+import utils
+
+SCENE_DIR: str = "scenes"
+OPERATORS: dict[type, Callable[..., Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.USub: operator.neg,
+}
+
+
+def evaluate(value: Any, variables: dict[str, Any]) -> Any:
+    """A definition's number, which may be arithmetic on variables written as a
+    string, like "height - 65". Lists are evaluated item by item"""
+    if isinstance(value, list):
+        return [evaluate(item, variables) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def walk(node: ast.AST) -> Any:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in variables:
+            return variables[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            return OPERATORS[type(node.op)](walk(node.left), walk(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+            return OPERATORS[type(node.op)](walk(node.operand))
+        raise ValueError(f"Can't evaluate {ast.unparse(node)} in {value!r}")
+
+    return walk(ast.parse(value, mode="eval").body)
+
+
+def resolve(value: Any, context: dict[str, Any]) -> Any:
+    """Swaps "$name" for context[name] and "pygame.NAME" for the pygame constant,
+    throughout lists and dicts"""
+    if isinstance(value, list):
+        return [resolve(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: resolve(item, context) for key, item in value.items()}
+    if isinstance(value, str) and value.startswith("$"):
+        if value[1:] not in context:
+            raise KeyError(f"Nothing called {value[1:]} was given to the scene")
+        return context[value[1:]]
+    if isinstance(value, str) and value.startswith("pygame."):
+        return getattr(pygame, value.removeprefix("pygame."))
+    return value
+
+
+class ElementTemplate:
+    def __init__(
+        self,
+        surf: pygame.Surface,
+        rect: pygame.Rect,
+        path: Optional[pathlib.Path],
+        listeners: list[dict[str, Any]],
+        visible: bool,
+    ) -> None:
+        """A laid out element, with its surface already rendered. The surface is
+        shared by every instance"""
+        self.surf = surf
+        self.rect = rect
+        self.path = path
+        self.listeners = listeners
+        self.visible = visible
+
+
+class SceneTemplate:
+    def __init__(
+        self,
+        definition: dict[str, Any],
+        variables: dict[str, Any],
+        fonts: Sequence[pygame.font.Font],
+    ) -> None:
+        """A scene definition laid out for one set of variables, like the window's
+        size"""
+        variables = dict(variables)
+        for name, value in definition.get("variables", {}).items():
+            variables[name] = evaluate(value, variables)
+        self.background: ElementTemplate = self.prepare(
+            definition["background"], variables, fonts
+        )
+        self.layers: list[tuple[bool, list[ElementTemplate]]] = [
+            (
+                layer.get("static", False),
+                [self.prepare(spec, variables, fonts) for spec in layer["elements"]],
+            )
+            for layer in definition["layers"]
+        ]
+        self.listeners: list[dict[str, Any]] = definition.get("listeners", [])
+        self.definition = definition
+
+    @staticmethod
+    def prepare(
+        spec: dict[str, Any],
+        variables: dict[str, Any],
+        fonts: Sequence[pygame.font.Font],
+    ) -> ElementTemplate:
+        """Renders an element's surface and places it. An element is a filled
+        rectangle with "colour" and "size", "text" in one of the "font"s, or an
+        "image", optionally scaled to "size"; at "x" and "y", by its centre if
+        "center" is set"""
+        spec = {
+            key: evaluate(value, variables) if key in ("x", "y", "size") else value
+            for key, value in spec.items()
+        }
+        path: Optional[pathlib.Path] = None
+        if "image" in spec:
+            image: sprite.Sprite = utils.get_asset(spec["image"])
+            path = image.path
+            surf: pygame.Surface = image.surf
+            if "size" in spec:
+                surf = surface_cache.scaled(surf, path, spec["size"])
+        elif "text" in spec:
+            surf = surface_cache.rendered_text(
+                fonts[spec.get("font", 0)],
+                spec["text"],
+                True,
+                spec.get("colour", (0, 0, 0)),
+            )
+        elif "colour" in spec:
+            surf = pygame.Surface((int(spec["size"][0]), int(spec["size"][1])))
+            surf.fill(spec["colour"])
+            surf = surf.convert_alpha()
+        else:
+            raise ValueError(f"An element needs an image, text or colour: {spec}")
+        rect: pygame.Rect = surf.get_rect()
+        position: tuple[int, int] = (int(spec.get("x", 0)), int(spec.get("y", 0)))
+        if spec.get("center", False):
+            rect.center = position
+        else:
+            rect.topleft = position
+        return ElementTemplate(
+            surf, rect, path, spec.get("listeners", []), spec.get("visible", True)
+        )
+
+    @staticmethod
+    def register(
+        holder: element.ListenerHolder,
+        listeners: list[dict[str, Any]],
+        context: dict[str, Any],
+    ) -> None:
+        for listener in listeners:
+            event_type: int | str = listener["event"]
+            if isinstance(event_type, str) and event_type.startswith("pygame."):
+                event_type = getattr(pygame, event_type.removeprefix("pygame."))
+            holder.register_listener(
+                event_type,
+                resolve(listener["handler"], context),
+                resolve(listener.get("options", {}), context),
+            )
+
+    def instantiate(
+        self,
+        context: dict[str, Any],
+        is_async: bool = False,
+        executor: Optional[cf_p.ProcessPoolExecutor] = None,
+    ) -> scene.Scene:
+        def build(template: ElementTemplate) -> sprite.Sprite:
+            return sprite.Sprite(
+                template.surf,
+                template.rect.copy(),
+                path=template.path,
+                is_async=is_async,
+                executor=executor,
+            )
+
+        new_scene: scene.Scene = scene.Scene(build(self.background))
+        new_scene.elements = []
+        for i, (static, layer_templates) in enumerate(self.layers):
+            layer: list[element.Element] = []
+            for template in layer_templates:
+                e: element.Element = element.Element(
+                    build(template), visible=template.visible
+                )
+                self.register(e, template.listeners, context)
+                layer.append(e)
+            new_scene.elements.append(layer)
+            if static:
+                new_scene.set_layer_static(i)
+        self.register(new_scene, self.listeners, context)
+        return new_scene
+
+
+# Parsed definitions by path, and laid out templates by scene, variables and fonts
+definitions: dict[pathlib.Path, tuple[int, dict[str, Any]]] = {}
+templates: dict[tuple[Any, ...], SceneTemplate] = {}
+
+
+def load_definition(
+    name: str, scene_dir: str | pathlib.Path = SCENE_DIR
+) -> dict[str, Any]:
+    """The parsed definition in scene_dir/name.json, parsed again if the file has
+    changed since"""
+    path: pathlib.Path = pathlib.Path(scene_dir) / f"{name}.json"
+    modified: int = path.stat().st_mtime_ns
+    if path not in definitions or definitions[path][0] != modified:
+        with path.open("r", encoding="utf-8") as f:
+            definitions[path] = (modified, json.load(f))
+    return definitions[path][1]
+
+
+def load(
+    name: str,
+    variables: dict[str, Any],
+    fonts: Sequence[pygame.font.Font],
+    context: dict[str, Any],
+    *,
+    is_async: bool = False,
+    executor: Optional[cf_p.ProcessPoolExecutor] = None,
+) -> scene.Scene:
+    """Makes a scene from its definition, laid out once per set of variables"""
+    definition: dict[str, Any] = load_definition(name)
+    key: tuple[Any, ...] = (name, tuple(sorted(variables.items())), tuple(fonts))
+    # A definition that has been parsed again needs laying out again
+    if key not in templates or templates[key].definition is not definition:
+        templates[key] = SceneTemplate(definition, variables, fonts)
+    return templates[key].instantiate(context, is_async, executor)
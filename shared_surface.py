@@ -0,0 +1,78 @@
+import multiprocessing.shared_memory as mp_shm
+import weakref
+from typing import Optional, Sequence
+
+import pygame
+
+
+class SharedSurface:
+    def __init__(self, size: Sequence[int], name: Optional[str] = None) -> None:
+        """RGBA pixels in shared memory, usable as a pygame.Surface by both processes
+        without pickling. Given a name, it attaches to that block instead"""
+        self.size: tuple[int, int] = (int(size[0]), int(size[1]))
+        self.owner: bool = name is None
+        self.shm: mp_shm.SharedMemory = mp_shm.SharedMemory(
+            name=name, create=self.owner, size=max(self.nbytes, 1)
+        )
+        self.buf: memoryview = self.shm.buf  # type: ignore[assignment]
+        self.__views: list[pygame.Surface] = []
+        self.__finalizer = weakref.finalize(
+            self, SharedSurface.release, self.shm, self.owner, self.__views
+        )
+
+    @classmethod
+    def from_surface(cls, surf: pygame.Surface) -> "SharedSurface":
+        shared: SharedSurface = cls(surf.get_size())
+        shared.write(surf)
+        return shared
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.size[0] * self.size[1] * 4
+
+    @property
+    def handle(self) -> tuple[str, tuple[int, int]]:
+        return (self.name, self.size)
+
+    def write(self, surf: pygame.Surface) -> None:
+        if surf.get_size() != self.size:
+            raise ValueError(
+                f"Surface of size {surf.get_size()} does not fit in a shared surface "
+                f"of size {self.size}"
+            )
+        if not surf.get_flags() & pygame.SRCALPHA:
+            # An opaque surface's unused alpha bytes can come out as 0, which would
+            # make it transparent once converted in the draw process
+            opaque: pygame.Surface = pygame.Surface(self.size, pygame.SRCALPHA)
+            opaque.blit(surf, (0, 0))
+            surf = opaque
+        self.buf[: self.nbytes] = pygame.image.tobytes(surf, "RGBA")
+
+    def view(self) -> pygame.Surface:
+        if len(self.__views) == 0:
+            self.__views.append(
+                pygame.image.frombuffer(self.buf[: self.nbytes], self.size, "RGBA")
+            )
+        return self.__views[0]
+
+    def close(self) -> None:
+        self.__finalizer()
+
+    @staticmethod
+    def release(
+        shm: mp_shm.SharedMemory, owner: bool, views: list[pygame.Surface]
+    ) -> None:
+        views.clear()
+        try:
+            shm.close()
+        except BufferError:
+            return
+        if owner:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
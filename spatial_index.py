@@ -0,0 +1,88 @@
+from typing import Generic, Hashable, Iterator, TypeVar
+
+import pygame
+
+T = TypeVar("T", bound=Hashable)
+
+
+class SpatialGrid(Generic[T]):
+    def __init__(self, cell_size: int = 128) -> None:
+        """A uniform grid of buckets, so finding what overlaps an area only looks at
+        the cells under it"""
+        if cell_size <= 0:
+            raise ValueError("The cell size must be positive")
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], set[T]] = {}
+        self.rects: dict[T, pygame.Rect] = {}
+        self.__item_cells: dict[T, list[tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rects)
+
+    def __contains__(self, item: T) -> bool:
+        return item in self.rects
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.rects)
+
+    def cells_for(self, rect: pygame.Rect) -> list[tuple[int, int]]:
+        if rect.width <= 0 or rect.height <= 0:
+            return []
+        return [
+            (cell_x, cell_y)
+            for cell_x in range(
+                rect.left // self.cell_size, (rect.right - 1) // self.cell_size + 1
+            )
+            for cell_y in range(
+                rect.top // self.cell_size, (rect.bottom - 1) // self.cell_size + 1
+            )
+        ]
+
+    def insert(self, item: T, rect: pygame.Rect) -> None:
+        if item in self.rects:
+            self.move(item, rect)
+            return
+        self.rects[item] = rect.copy()
+        self.__item_cells[item] = self.cells_for(rect)
+        for cell in self.__item_cells[item]:
+            self.cells.setdefault(cell, set()).add(item)
+
+    def move(self, item: T, rect: pygame.Rect) -> None:
+        if item not in self.rects:
+            raise KeyError(f"{item} is not in the grid")
+        self.rects[item] = rect.copy()
+        new_cells: list[tuple[int, int]] = self.cells_for(rect)
+        if new_cells == self.__item_cells[item]:
+            return
+        self.__unlink(item)
+        self.__item_cells[item] = new_cells
+        for cell in new_cells:
+            self.cells.setdefault(cell, set()).add(item)
+
+    def remove(self, item: T) -> None:
+        if item not in self.rects:
+            return
+        self.__unlink(item)
+        del self.__item_cells[item]
+        del self.rects[item]
+
+    def __unlink(self, item: T) -> None:
+        for cell in self.__item_cells[item]:
+            bucket: set[T] = self.cells[cell]
+            bucket.discard(item)
+            if len(bucket) == 0:
+                del self.cells[cell]
+
+    def clear(self) -> None:
+        self.cells = {}
+        self.rects = {}
+        self.__item_cells = {}
+
+    def query(self, area: pygame.Rect) -> set[T]:
+        """Everything whose rect overlaps area"""
+        found: set[T] = set()
+        for cell in self.cells_for(area):
+            bucket: set[T] | None = self.cells.get(cell)
+            if bucket is not None:
+                found.update(bucket)
+        return {item for item in found if self.rects[item].colliderect(area)}
@@ -2,11 +2,12 @@ import concurrent.futures as cf
 import concurrent.futures._base as cf_b
 import concurrent.futures.process as cf_p
 import pathlib
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 import pygame
 
 import draw_process_funcs as dpf
+import surface_cache
 
 
 class Sprite:
@@ -25,6 +26,12 @@ class Sprite:
         if self.is_async and executor is None:
             raise TypeError("An executor must be provided to do asynchronous execution")
         self.executor = executor
+        self.dirty: bool = True
+        self.version: int = 0
+        # Set by sprites that draw their surface lazily, so render() draws it the
+        # next time it is used
+        self.stale: bool = False
+        self.__watchers: list[Callable[[], None]] = []
         self.__surf = surf
         self.__rect = rect
         self.rect_options = rect_options
@@ -43,6 +50,9 @@ class Sprite:
 
     @property
     def surf(self) -> pygame.Surface:
+        if self.stale:
+            self.stale = False
+            self.surf = self.render()
         if self.__surf is not None:
             return self.__surf
         raise ValueError("This sprite's surface is invalid")
@@ -67,6 +77,10 @@ class Sprite:
             self.__surf = pygame.image.frombuffer(res[0], res[1], res[2])
         else:
             self.__surf = new_surf  # .convert_alpha()
+        # A surface from outside may be shared, like a cached asset or scaled copy
+        self.owned = False
+        self.version += 1
+        self.touch()
 
     @surf.deleter
     def surf(self) -> None:
@@ -81,6 +95,7 @@ class Sprite:
     @rect.setter
     def rect(self, new_rect: pygame.Rect) -> None:
         self.__rect = new_rect
+        self.touch()
         self.x = new_rect.x
         self.y = new_rect.y
         self.width = new_rect.width
@@ -98,6 +113,7 @@ class Sprite:
     def x(self, new_x: int) -> None:
         self.__x = new_x
         self.rect.x = new_x
+        self.touch()
 
     @x.deleter
     def x(self) -> None:
@@ -111,6 +127,7 @@ class Sprite:
     def y(self, new_y: int) -> None:
         self.__y = new_y
         self.rect.y = new_y
+        self.touch()
 
     @y.deleter
     def y(self) -> None:
@@ -124,6 +141,7 @@ class Sprite:
     def width(self, new_width: int) -> None:
         self.__width = new_width
         self.rect.width = new_width
+        self.touch()
 
     @width.deleter
     def width(self) -> None:
@@ -137,11 +155,42 @@ class Sprite:
     def height(self, new_height: int) -> None:
         self.__height = new_height
         self.rect.height = new_height
+        self.touch()
 
     @height.deleter
     def height(self) -> None:
         del self.__height
 
+    def touch(self) -> None:
+        """Marks the sprite as changed, for anything drawing or indexing it"""
+        self.dirty = True
+        for watcher in self.__watchers:
+            watcher()
+
+    def watch(self, watcher: Callable[[], None]) -> None:
+        if watcher not in self.__watchers:
+            self.__watchers.append(watcher)
+
+    def unwatch(self, watcher: Callable[[], None]) -> None:
+        if watcher in self.__watchers:
+            self.__watchers.remove(watcher)
+
+    def render(self) -> pygame.Surface:
+        """The surface of a stale sprite, drawn again"""
+        raise NotImplementedError("Only sprites that draw their surface can be stale")
+
+    def writable(self) -> pygame.Surface:
+        """The surface, to draw on, with the sprite marked as changed. One that may
+        be shared with other sprites is copied first, so the change only shows up on
+        this sprite"""
+        if self.owned:
+            self.version += 1
+            self.touch()
+        else:
+            self.surf = self.surf.copy()
+            self.owned = True
+        return self.surf
+
     def clone(self) -> pygame.Surface:
         if self.surf is not None:
             return self.surf.copy()
@@ -186,9 +235,12 @@ class Sprite:
             )
             self.color = self.colour
             self.background = self.__get_val_from_dict(font_options, "background")
-            self.surf = self.font.render(
-                self.text, self.anti_alias, self.colour, self.background
-            ).convert_alpha()
+            rendered: pygame.Surface = surface_cache.rendered_text(
+                self.font, self.text, self.anti_alias, self.colour, self.background
+            )
+            # Unchanged text keeps its surface, and so its version
+            if rendered is not self.__surf:
+                self.surf = rendered
             self.rect = rect if rect is not None else self.surf.get_rect()
         elif self.is_rect:
             if rect is None:
@@ -203,6 +255,7 @@ class Sprite:
             self.surf = pygame.Surface((self.width, self.height))
             self.surf.fill(self.colour)
             self.surf = self.surf.convert_alpha()
+            self.owned = True
         elif surf is not None:
             self.surf = surf
             if rect is None:
@@ -220,8 +273,9 @@ class Sprite:
         else:
             self.rect.x = x
             self.rect.y = y
+        self.rect = self.rect
 
-    def scale(self, scale: float) -> pygame.Surface:
+    def scale(self, scale: float, smooth: bool = False) -> pygame.Surface:
         if scale == 1.0:
             return self.surf
         new_dimensions: tuple[int, int] = (
@@ -230,11 +284,7 @@ class Sprite:
         )
         self.rect.update(self.x, self.y, new_dimensions[0], new_dimensions[1])
         self.rect = self.rect
-        scaled: pygame.Surface = pygame.transform.scale(
-            self.surf,
-            (
-                new_dimensions[0],
-                new_dimensions[1],
-            ),
-        )
-        return scaled
+        # An owned surface may have been drawn on, so it no longer matches the
+        # asset at path that the cache would key it under
+        path: Optional[pathlib.Path] = None if self.owned else self.path
+        return surface_cache.scaled(self.surf, path, new_dimensions, smooth)
@@ -0,0 +1,154 @@
+import collections
+import pathlib
+from typing import Any, Hashable, Optional, Sequence
+
+import pygame
+
+CacheKey = tuple[str, tuple[int, int], bool]
+
+
+class SurfaceCache:
+    def __init__(self, budget: int = 64 * 1024 * 1024) -> None:
+        """Scaled asset images kept for reuse, dropping the least recently used once
+        they take up more than budget bytes"""
+        if budget < 0:
+            raise ValueError("The budget can't be negative")
+        self.budget = budget
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.__entries: collections.OrderedDict[Hashable, pygame.Surface] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    @staticmethod
+    def cost(surf: pygame.Surface) -> int:
+        return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+    @staticmethod
+    def key(
+        path: str | pathlib.Path, size: Sequence[int], smooth: bool = False
+    ) -> CacheKey:
+        return (pathlib.Path(path).as_posix(), (int(size[0]), int(size[1])), smooth)
+
+    def get(self, key: Hashable) -> Optional[pygame.Surface]:
+        surf: Optional[pygame.Surface] = self.__entries.get(key)
+        if surf is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return surf
+
+    def put(self, key: Hashable, surf: pygame.Surface) -> None:
+        if key in self.__entries:
+            self.size -= self.cost(self.__entries.pop(key))
+        if self.cost(surf) > self.budget:
+            return
+        self.__entries[key] = surf
+        self.size += self.cost(surf)
+        self.trim()
+
+    def trim(self) -> None:
+        while self.size > self.budget:
+            _, evicted = self.__entries.popitem(last=False)
+            self.size -= self.cost(evicted)
+            self.evictions += 1
+
+    def resize(self, budget: int) -> None:
+        if budget < 0:
+            raise ValueError("The budget can't be negative")
+        self.budget = budget
+        self.trim()
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self.__entries),
+            "bytes": self.size,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def scaled(
+        self,
+        surf: pygame.Surface,
+        path: Optional[str | pathlib.Path],
+        size: Sequence[int],
+        smooth: bool = False,
+    ) -> pygame.Surface:
+        """surf, the image at path, scaled to size. The result may be shared, so copy
+        it before drawing onto it"""
+        target: tuple[int, int] = (int(size[0]), int(size[1]))
+        if path is None:
+            return self.__transform(surf, target, smooth)
+        key: CacheKey = self.key(path, target, smooth)
+        cached: Optional[pygame.Surface] = self.get(key)
+        if cached is not None:
+            return cached
+        result: pygame.Surface = self.__transform(surf, target, smooth)
+        self.put(key, result)
+        return result
+
+    @staticmethod
+    def __transform(
+        surf: pygame.Surface, size: tuple[int, int], smooth: bool
+    ) -> pygame.Surface:
+        # smoothscale only takes 24 and 32 bit surfaces
+        if smooth and surf.get_bitsize() in (24, 32):
+            return pygame.transform.smoothscale(surf, size)
+        return pygame.transform.scale(surf, size)
+
+
+# Shared by every sprite in the process
+cache: SurfaceCache = SurfaceCache()
+# Rendered text, which is small, so it gets a small budget of its own rather than
+# pushing scaled images out
+text_cache: SurfaceCache = SurfaceCache(budget=8 * 1024 * 1024)
+
+
+def scaled(
+    surf: pygame.Surface,
+    path: Optional[str | pathlib.Path],
+    size: Sequence[int],
+    smooth: bool = False,
+) -> pygame.Surface:
+    return cache.scaled(surf, path, size, smooth)
+
+
+def rendered_text(
+    font: pygame.font.Font,
+    text: str,
+    anti_alias: bool,
+    colour: Any,
+    background: Any = None,
+) -> pygame.Surface:
+    """font.render(), converted, from the cache when the same string has been
+    rendered the same way before. The result may be shared, so copy it before
+    drawing onto it"""
+    # Colours can be lists, strings or pygame.Color, so they are normalised to be
+    # hashable, and so that equal colours share an entry
+    key: tuple[Any, ...] = (
+        font,
+        text,
+        anti_alias,
+        tuple(pygame.Color(colour)),
+        None if background is None else tuple(pygame.Color(background)),
+    )
+    surf: Optional[pygame.Surface] = text_cache.get(key)
+    if surf is None:
+        surf = font.render(text, anti_alias, colour, background).convert_alpha()
+        text_cache.put(key, surf)
+    return surf
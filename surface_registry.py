@@ -0,0 +1,181 @@
+import collections
+import hashlib
+from typing import Any, Optional
+
+import pygame
+
+import frame_commands
+import shared_surface
+import utils
+
+
+class SurfaceRegistry(metaclass=utils.Singleton):
+    def __init__(self) -> None:
+        """Tracks which surfaces have been uploaded to the draw process. Surfaces with
+        the same pixels share one handle, and pixels only cross the process boundary
+        when a handle is first uploaded, replaced, or was evicted to stay under cap
+        """
+        if not hasattr(self, "created"):
+            self.created: bool = True
+            self.handles: dict[bytes, int] = {}
+            self.digests: dict[int, bytes] = {}
+            self.refs: dict[int, int] = {}
+            self.resident: set[int] = set()
+            # The most bytes of pixels the draw process is asked to hold
+            self.cap: int = 64 * 1024 * 1024
+            self.bytes: int = 0
+            self.evictions: int = 0
+            self.__sizes: dict[int, int] = {}
+            # Resident handles, least recently drawn first
+            self.__recent: collections.OrderedDict[int, None] = (
+                collections.OrderedDict()
+            )
+            # Handles drawn this frame, which mustn't be evicted before it's drawn
+            self.__drawing: set[int] = set()
+            self.__next_handle: int = 0
+            self.__pending_frees: list[int] = []
+            self.__staging: list[shared_surface.SharedSurface] = []
+            self.__in_flight: list[shared_surface.SharedSurface] = []
+
+    @staticmethod
+    def digest(surf: pygame.Surface) -> bytes:
+        return hashlib.blake2b(
+            pygame.image.tobytes(surf, "RGBA") + repr(surf.get_size()).encode(),
+            digest_size=16,
+        ).digest()
+
+    def __check_size(self, surf: pygame.Surface) -> None:
+        if surf.get_width() * surf.get_height() * 4 > self.cap:
+            raise ValueError(
+                f"A surface of size {surf.get_size()} is larger than the draw "
+                f"process's cap of {self.cap} bytes"
+            )
+
+    def __upload(
+        self, handle: int, surf: pygame.Surface, commands: frame_commands.FrameCommands
+    ) -> None:
+        staging: shared_surface.SharedSurface = (
+            shared_surface.SharedSurface.from_surface(surf)
+        )
+        self.__staging.append(staging)
+        commands.upload(handle, staging.handle)
+        self.__forget(handle)
+        self.resident.add(handle)
+        self.__sizes[handle] = staging.nbytes
+        self.bytes += staging.nbytes
+        self.__use(handle)
+        self.__evict(commands)
+
+    def __use(self, handle: int) -> None:
+        self.__recent[handle] = None
+        self.__recent.move_to_end(handle)
+        self.__drawing.add(handle)
+
+    def __forget(self, handle: int) -> None:
+        self.resident.discard(handle)
+        self.__recent.pop(handle, None)
+        self.bytes -= self.__sizes.pop(handle, 0)
+
+    def __evict(self, commands: frame_commands.FrameCommands) -> None:
+        """Frees the least recently drawn handles until the draw process holds no
+        more than cap. Handles drawn this frame are kept, so the draw process is
+        never asked to draw one it was told to free"""
+        for handle in list(self.__recent):
+            if self.bytes <= self.cap:
+                return
+            if handle in self.__drawing:
+                continue
+            self.__forget(handle)
+            commands.free(handle)
+            self.evictions += 1
+
+    def acquire(
+        self,
+        surf: pygame.Surface,
+        commands: frame_commands.FrameCommands,
+        key: Optional[bytes] = None,
+    ) -> int:
+        """Returns the handle for surf's pixels, uploading them if no handle has them.
+        A key identifies the pixels instead of hashing them, for large surfaces"""
+        self.__check_size(surf)
+        digest: bytes = self.digest(surf) if key is None else key
+        if digest in self.handles:
+            handle: int = self.handles[digest]
+            self.refs[handle] += 1
+            self.ensure_resident(handle, surf, commands)
+            return handle
+        handle = self.__next_handle
+        self.__next_handle += 1
+        self.handles[digest] = handle
+        self.digests[handle] = digest
+        self.refs[handle] = 1
+        self.__upload(handle, surf, commands)
+        return handle
+
+    def replace(
+        self,
+        handle: int,
+        surf: pygame.Surface,
+        commands: frame_commands.FrameCommands,
+        key: Optional[bytes] = None,
+    ) -> int:
+        self.__check_size(surf)
+        digest: bytes = self.digest(surf) if key is None else key
+        if self.refs.get(handle, 0) != 1 or digest in self.handles:
+            new_handle: int = self.acquire(surf, commands, digest)
+            self.release(handle)
+            return new_handle
+        del self.handles[self.digests[handle]]
+        self.handles[digest] = handle
+        self.digests[handle] = digest
+        self.__upload(handle, surf, commands)
+        return handle
+
+    def release(self, handle: int) -> None:
+        if handle not in self.refs:
+            return
+        self.refs[handle] -= 1
+        if self.refs[handle] <= 0:
+            del self.refs[handle]
+            del self.handles[self.digests.pop(handle)]
+            self.__forget(handle)
+            self.__pending_frees.append(handle)
+
+    def ensure_resident(
+        self,
+        handle: int,
+        surf: pygame.Surface,
+        commands: frame_commands.FrameCommands,
+    ) -> None:
+        if handle not in self.resident:
+            self.__upload(handle, surf, commands)
+        else:
+            self.__use(handle)
+
+    def mark_evicted(self, handle: int) -> None:
+        self.__forget(handle)
+
+    def start_frame(self, commands: frame_commands.FrameCommands) -> None:
+        self.__drawing = set()
+        for handle in self.__pending_frees:
+            commands.free(handle)
+        self.__pending_frees = []
+
+    def submitted(self) -> None:
+        self.__in_flight.extend(self.__staging)
+        self.__staging = []
+
+    def frame_done(self) -> None:
+        for staging in self.__in_flight:
+            staging.close()
+        self.__in_flight = []
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "handles": len(self.refs),
+            "resident": len(self.resident),
+            "references": sum(self.refs.values()),
+            "bytes": self.bytes,
+            "cap": self.cap,
+            "evictions": self.evictions,
+        }
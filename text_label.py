@@ -0,0 +1,42 @@
+from typing import Any, Optional
+
+import pygame
+
+import element
+import glyph_atlas
+import sprite
+
+
+class TextLabel(element.Element):
+    def __init__(
+        self,
+        glyphs: glyph_atlas.GlyphAtlas,
+        text: str,
+        rect_options: Optional[dict[str, Any]] = None,
+        visible: bool = True,
+    ) -> None:
+        """Text drawn from a glyph atlas into a kept surface, for labels that change
+        often, like counters"""
+        self.glyphs = glyphs
+        self.text = text
+        surf: pygame.Surface = glyphs.render(text)
+        design: sprite.Sprite = sprite.Sprite(surf, rect_options=rect_options)
+        design.owned = True
+        super().__init__(design, mask=surf.get_rect(), visible=visible)
+
+    def set_text(self, text: str) -> None:
+        if text == self.text:
+            return
+        self.text = text
+        width, height = self.glyphs.size(text)
+        if width > self.design.surf.get_width():
+            self.design.surf = self.glyphs.render(text)
+            self.design.owned = True
+        else:
+            surf: pygame.Surface = self.design.writable()
+            colour: pygame.Color = self.glyphs.colour
+            surf.fill((colour.r, colour.g, colour.b, 0))
+            self.glyphs.render_to(surf, text)
+        self.mask = pygame.Rect(0, 0, width, height)
+        self.design.rect.size = (width, height)
+        self.design.rect = self.design.rect
@@ -0,0 +1,212 @@
+import array
+from typing import Callable, Iterator, Optional, Sequence
+
+import pygame
+
+import element
+import sprite
+import utils
+
+# Stands in for a chunk's surface until the chunk is first drawn
+placeholder: pygame.Surface = pygame.Surface((0, 0))
+
+
+class Tileset:
+    def __init__(
+        self,
+        asset_location: str,
+        tile_size: Optional[Sequence[int]] = None,
+        scale: float | Sequence[float] = 1.0,
+    ) -> None:
+        """Cuts an image into tiles, numbered left to right, then top to bottom. A
+        pair of scales stretches them differently across and down"""
+        sheet: pygame.Surface = utils.get_asset(asset_location).surf
+        if tile_size is None:
+            tile_size = sheet.get_size()
+        if tile_size[0] <= 0 or tile_size[1] <= 0:
+            raise ValueError(f"Tiles must have a positive size. Size: {tile_size}")
+        if isinstance(scale, (int, float)):
+            scale = (scale, scale)
+        self.tile_size: tuple[int, int] = (
+            int(tile_size[0] * scale[0]),
+            int(tile_size[1] * scale[1]),
+        )
+        self.tiles: list[pygame.Surface] = []
+        for y in range(0, sheet.get_height() - tile_size[1] + 1, tile_size[1]):
+            for x in range(0, sheet.get_width() - tile_size[0] + 1, tile_size[0]):
+                tile: pygame.Surface = sheet.subsurface(
+                    pygame.Rect(x, y, tile_size[0], tile_size[1])
+                )
+                if self.tile_size != tile.get_size():
+                    tile = pygame.transform.scale(tile, self.tile_size)
+                self.tiles.append(tile)
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def __getitem__(self, index: int) -> pygame.Surface:
+        return self.tiles[index]
+
+
+class ChunkSprite(sprite.Sprite):
+    def __init__(self, rect: pygame.Rect, render: Callable[[], pygame.Surface]) -> None:
+        """A sprite whose surface is only rendered when something first uses it, and
+        again after invalidate()"""
+        self.__render = render
+        super().__init__(placeholder, rect)
+        self.stale = True
+
+    def render(self) -> pygame.Surface:
+        return self.__render()
+
+    def invalidate(self) -> None:
+        if not self.stale:
+            self.stale = True
+            # Bumped now, so the draw process sees a new version before the
+            # surface is rendered again
+            self.version += 1
+            self.touch()
+
+
+class TileChunk(element.Element):
+    def __init__(self, tile_map: "TileMap", chunk: tuple[int, int]) -> None:
+        self.chunk = chunk
+        super().__init__(
+            ChunkSprite(
+                tile_map.chunk_rect(chunk), lambda: tile_map.render_chunk(chunk)
+            ),
+            visible=True,
+        )
+
+    @property
+    def screen_rect(self) -> pygame.Rect:
+        # The chunk's bounds are known without rendering it, which keeps the
+        # spatial index from rendering every chunk in the map
+        return self.design.rect.copy()
+
+
+class TileMap:
+    def __init__(
+        self,
+        tileset: Tileset,
+        size: Sequence[int],
+        chunk_size: int = 16,
+        fill: int = -1,
+    ) -> None:
+        """A grid of tile indices in square chunks, each an element that renders its
+        tiles to one surface and keeps it until one of them changes"""
+        if chunk_size <= 0:
+            raise ValueError("The chunk size must be positive")
+        self.tileset = tileset
+        self.size: tuple[int, int] = (size[0], size[1])
+        self.chunk_size = chunk_size
+        self.chunk_counts: tuple[int, int] = (
+            -(-self.size[0] // chunk_size),
+            -(-self.size[1] // chunk_size),
+        )
+        self.tiles: dict[tuple[int, int], array.array] = {}
+        self.chunks: dict[tuple[int, int], TileChunk] = {}
+        for chunk in self.all_chunks():
+            width, height = self.chunk_tile_size(chunk)
+            self.tiles[chunk] = array.array("h", [fill]) * (width * height)
+            self.chunks[chunk] = TileChunk(self, chunk)
+
+    @property
+    def pixel_size(self) -> tuple[int, int]:
+        return (
+            self.size[0] * self.tileset.tile_size[0],
+            self.size[1] * self.tileset.tile_size[1],
+        )
+
+    @property
+    def elements(self) -> list[element.Element]:
+        """The chunks, to be put in one of a scene's layers"""
+        return list(self.chunks.values())
+
+    def all_chunks(self) -> Iterator[tuple[int, int]]:
+        for chunk_y in range(self.chunk_counts[1]):
+            for chunk_x in range(self.chunk_counts[0]):
+                yield (chunk_x, chunk_y)
+
+    def chunk_tile_size(self, chunk: tuple[int, int]) -> tuple[int, int]:
+        return (
+            min(self.chunk_size, self.size[0] - chunk[0] * self.chunk_size),
+            min(self.chunk_size, self.size[1] - chunk[1] * self.chunk_size),
+        )
+
+    def chunk_rect(self, chunk: tuple[int, int]) -> pygame.Rect:
+        width, height = self.chunk_tile_size(chunk)
+        return pygame.Rect(
+            chunk[0] * self.chunk_size * self.tileset.tile_size[0],
+            chunk[1] * self.chunk_size * self.tileset.tile_size[1],
+            width * self.tileset.tile_size[0],
+            height * self.tileset.tile_size[1],
+        )
+
+    def __locate(self, column: int, row: int) -> tuple[tuple[int, int], int]:
+        if not (0 <= column < self.size[0] and 0 <= row < self.size[1]):
+            raise IndexError(f"Tile ({column}, {row}) is outside the map")
+        chunk: tuple[int, int] = (column // self.chunk_size, row // self.chunk_size)
+        width: int = self.chunk_tile_size(chunk)[0]
+        return chunk, (row % self.chunk_size) * width + column % self.chunk_size
+
+    def get_tile(self, column: int, row: int) -> int:
+        chunk, i = self.__locate(column, row)
+        return self.tiles[chunk][i]
+
+    def set_tile(self, column: int, row: int, tile: int) -> None:
+        if not -1 <= tile < len(self.tileset):
+            raise ValueError(f"There is no tile {tile} in the tileset")
+        chunk, i = self.__locate(column, row)
+        if self.tiles[chunk][i] != tile:
+            self.tiles[chunk][i] = tile
+            self.invalidate(chunk)
+
+    def fill_rect(self, area: pygame.Rect, tile: int) -> None:
+        """Sets every tile in area, given in tiles, invalidating each chunk once"""
+        if not -1 <= tile < len(self.tileset):
+            raise ValueError(f"There is no tile {tile} in the tileset")
+        area = area.clip(pygame.Rect(0, 0, self.size[0], self.size[1]))
+        changed: set[tuple[int, int]] = set()
+        for row in range(area.top, area.bottom):
+            for column in range(area.left, area.right):
+                chunk, i = self.__locate(column, row)
+                if self.tiles[chunk][i] != tile:
+                    self.tiles[chunk][i] = tile
+                    changed.add(chunk)
+        for chunk in changed:
+            self.invalidate(chunk)
+
+    def tile_at(self, pos: Sequence[int]) -> tuple[int, int]:
+        """The column and row of the tile under a world position"""
+        return (
+            pos[0] // self.tileset.tile_size[0],
+            pos[1] // self.tileset.tile_size[1],
+        )
+
+    def invalidate(self, chunk: Optional[tuple[int, int]] = None) -> None:
+        """Throws away a chunk's rendered surface, or every chunk's if none is given"""
+        for key in self.chunks if chunk is None else [chunk]:
+            design: sprite.Sprite = self.chunks[key].design
+            if isinstance(design, ChunkSprite):
+                design.invalidate()
+
+    def render_chunk(self, chunk: tuple[int, int]) -> pygame.Surface:
+        width, height = self.chunk_tile_size(chunk)
+        tile_width, tile_height = self.tileset.tile_size
+        surf: pygame.Surface = pygame.Surface(
+            (width * tile_width, height * tile_height), pygame.SRCALPHA
+        ).convert_alpha()
+        tiles: array.array = self.tiles[chunk]
+        surf.blits(
+            [
+                (
+                    self.tileset[tiles[i]],
+                    ((i % width) * tile_width, (i // width) * tile_height),
+                )
+                for i in range(width * height)
+                if tiles[i] != -1
+            ],
+            doreturn=False,
+        )
+        return surf
@@ -3,15 +3,26 @@ import concurrent.futures._base as cf_b
 import concurrent.futures.process as cf_p
 import multiprocessing as mp
 import multiprocessing.context as mp_c
+import multiprocessing.resource_tracker as mp_rt
 import pathlib
 from typing import Any, Callable, Literal, Optional, Sequence
 
 import pygame
 
+import atlas
+import bake_assets
 import draw_process_funcs as dpf
 import sprite
+import surface_cache
 
-__assets: dict[str, pygame.Surface] = {}
+# Loaded images by path. Sprites share these surfaces rather than copying them,
+# and copy on their first write through Sprite.writable()
+assets: surface_cache.SurfaceCache = surface_cache.SurfaceCache(
+    budget=128 * 1024 * 1024
+)
+atlases: list[atlas.Atlas] = []
+# Images a Preloader is decoding in the background, by path
+loading: dict[str, cf.Future[tuple[pygame.Surface, bool]]] = {}
 
 
 class AsyncRunner:
@@ -24,6 +35,9 @@ class AsyncRunner:
     ) -> None:
         self.start_method = start_method
         self.__ctx: mp_c.BaseContext = mp.get_context(self.start_method)
+        # Workers must share this process' resource tracker, or the one they start
+        # would unlink shared surfaces that are still in use when they exit
+        mp_rt.ensure_running()
         self.executor: cf_p.ProcessPoolExecutor = cf.ProcessPoolExecutor(
             max_workers=1,
             mp_context=self.__ctx,
@@ -36,16 +50,17 @@ class AsyncRunner:
 runners: dict[str, AsyncRunner] = {}
 
 
-def get_asset(
-    asset_location: str,
-    rect: Optional[pygame.Rect] = None,
-    rect_options: Optional[dict[str, Any]] = None,
-    scale: float = 1.0,
-    is_async: bool = False,
-    executor: Optional[cf_p.ProcessPoolExecutor] = None,
-) -> sprite.Sprite:
-    if is_async and executor is None:
-        raise TypeError("An executor must be provided to do asynchronous execution")
+def load_atlas(
+    asset_locations: Sequence[str | pathlib.Path], max_size: int = 2048
+) -> atlas.Atlas:
+    """Packs images into an atlas that get_asset() serves them from from now on. A
+    display mode must already be set"""
+    new_atlas: atlas.Atlas = atlas.Atlas(asset_locations, max_size=max_size)
+    atlases.append(new_atlas)
+    return new_atlas
+
+
+def asset_path(asset_location: str | pathlib.Path) -> pathlib.Path:
     absolute_path: pathlib.Path = pathlib.Path.joinpath(
         pathlib.Path.cwd(), asset_location
     )
@@ -74,33 +89,107 @@ def get_asset(
         raise RuntimeError(
             f"The file {absolute_path} does not have an appropriate extension/type"
         )
+    return absolute_path
+
+
+def decode_asset(absolute_path: pathlib.Path) -> tuple[pygame.Surface, bool]:
+    """Loads an image, preferring a fresh baked variant, and whether it has alpha.
+    Nothing is converted, so this is safe to run off the main thread"""
+    baked: Optional[tuple[bytes, tuple[int, int], Literal["RGB", "RGBA"]]] = (
+        bake_assets.lookup(absolute_path)
+    )
+    if baked is not None:
+        return pygame.image.frombytes(*baked), baked[2] == "RGBA"
+    return pygame.image.load(absolute_path), True
+
+
+def prepare_asset(decoded: tuple[pygame.Surface, bool]) -> pygame.Surface:
+    """Converts a decoded image for fast blitting. Must run on the main thread"""
+    surf, alpha = decoded
+    if "display" in runners:
+        # There is no display mode in this process to convert to, as the draw
+        # process converts surfaces itself
+        return surf
+    return surf.convert_alpha() if alpha else surf.convert()
+
+
+def store_loaded(posix_path: str) -> None:
+    """Waits for an image being decoded in the background, then caches it"""
+    future: cf.Future[tuple[pygame.Surface, bool]] = loading.pop(posix_path)
+    if not future.cancelled():
+        assets.put(posix_path, prepare_asset(future.result()))
+
+
+def finish_loading(limit: Optional[int] = None) -> int:
+    """Caches up to limit images that finished decoding in the background, and
+    returns how many there were"""
+    finished: list[str] = [path for path, f in loading.items() if f.done()][:limit]
+    for posix_path in finished:
+        store_loaded(posix_path)
+    return len(finished)
+
+
+def get_asset(
+    asset_location: str,
+    rect: Optional[pygame.Rect] = None,
+    rect_options: Optional[dict[str, Any]] = None,
+    scale: float = 1.0,
+    is_async: bool = False,
+    executor: Optional[cf_p.ProcessPoolExecutor] = None,
+) -> sprite.Sprite:
+    if is_async and executor is None:
+        raise TypeError("An executor must be provided to do asynchronous execution")
+    absolute_path: pathlib.Path = asset_path(asset_location)
     posix_path: str = absolute_path.as_posix()
-    if posix_path in __assets:
+    surf: pygame.Surface
+    design: sprite.Sprite
+    for loaded_atlas in atlases:
+        if posix_path in loaded_atlas.regions:
+            # A view into the shared sheet rather than a copy, so it is read only
+            return sprite.Sprite(
+                loaded_atlas.get(posix_path),
+                rect,
+                rect_options=rect_options,
+                scale=scale,
+                path=absolute_path,
+            )
+    if posix_path in loading:
+        store_loaded(posix_path)
+    cached: Optional[pygame.Surface] = assets.get(posix_path)
+    if cached is not None:
         return sprite.Sprite(
-            __assets[posix_path].copy(),
+            cached,
             rect,
             rect_options=rect_options,
             scale=scale,
+            path=absolute_path,
             is_async=is_async,
             executor=executor,
         )
     if "display" not in runners:
-        surf: pygame.Surface = pygame.image.load(absolute_path)
-        surf = surf.convert_alpha()
-        design: sprite.Sprite = sprite.Sprite(
+        surf = prepare_asset(decode_asset(absolute_path))
+        design = sprite.Sprite(
             surf, rect, rect_options=rect_options, scale=scale, path=absolute_path
         )
     else:
-        load_fut: cf_b.Future = runners["display"].executor.submit(
-            dpf.load_image, absolute_path
+        baked: Optional[tuple[bytes, tuple[int, int], Literal["RGB", "RGBA"]]] = (
+            bake_assets.lookup(absolute_path)
         )
-        cf.wait([load_fut])
-        res: tuple[
-            bytes,
-            Sequence[int] | tuple[int, int],
-            Literal["P", "RGB", "BGR", "BGRA", "RGBX", "RGBA", "ARGB"],
-        ] = load_fut.result()
-        surf = pygame.image.frombuffer(res[0], res[1], res[2])
+        if baked is not None:
+            # A pre-scaled variant, which is already raw pixels, so there is
+            # nothing to decode
+            surf = pygame.image.frombytes(*baked)
+        else:
+            load_fut: cf_b.Future = runners["display"].executor.submit(
+                dpf.load_image, absolute_path
+            )
+            cf.wait([load_fut])
+            res: tuple[
+                bytes,
+                Sequence[int] | tuple[int, int],
+                Literal["P", "RGB", "BGR", "BGRA", "RGBX", "RGBA", "ARGB"],
+            ] = load_fut.result()
+            surf = pygame.image.frombuffer(res[0], res[1], res[2])
         design = sprite.Sprite(
             surf,
             rect,
@@ -110,7 +199,7 @@ def get_asset(
             is_async=True,
             executor=runners["display"].executor,
         )
-    __assets[posix_path] = surf
+    assets.put(posix_path, surf)
     return design
 
 
@@ -123,3 +212,7 @@ class Singleton(type):
         else:
             cls._instances[cls].__init__(*args, **kwargs)
         return cls._instances[cls]
+
+    def register(cls, instance: Any) -> None:
+        """Makes cls() hand back instance, like a subclass standing in for it"""
+        cls._instances[cls] = instance